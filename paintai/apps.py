@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PaintaiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "paintai"
+
+    def ready(self):
+        from . import dashboard, live, lookups  # noqa: F401 Connects the cache invalidation and live dashboard signals
@@ -11,4 +11,12 @@ def activate_camera_fn(servicename,boolval):
 
 
 def get_active_non_deleted_camera_count_fn():
-    return Camera.objects.filter(isactivate=True, isdeleted=False).count()
\ No newline at end of file
+    return Camera.objects.filter(isactivate=True, isdeleted=False).count()
+
+
+# Async twins for the async views
+async def aget_total_camera_count_fn():
+    return await Camera.objects.filter(isdeleted=False).acount()
+
+async def aget_active_non_deleted_camera_count_fn():
+    return await Camera.objects.filter(isactivate=True, isdeleted=False).acount()
@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .camera import get_active_non_deleted_camera_count_fn, get_total_camera_count_fn
+from .models import Camera, Product
+from .products import get_all_products_fn, get_total_product_count_fn
+from .streamprocess.source.addCamera import get_camera_list_from_db
+
+SUMMARY_KEY = "paintai:dashboard_summary"
+SUMMARY_TTL = 300  # Seconds; also bounds how long the last-24-hours top production can lag behind
+
+
+def build_dashboard_summary():
+    """Everything the home and production pages load: totals, top production of the last day, cameras and products."""
+    from .productprod import get_productProduction_top_five_last_day  # productprod invalidates through this module
+
+    return {
+        "product_total": get_total_product_count_fn(),
+        "camera_total": get_total_camera_count_fn(),
+        "active_camera_total": get_active_non_deleted_camera_count_fn(),
+        "top_production": list(get_productProduction_top_five_last_day()),
+        "cameras": get_camera_list_from_db(),
+        "products": list(get_all_products_fn().values("id", "name", "createdon")),
+    }
+
+
+def get_dashboard_summary():
+    """Returns the cached summary, building it once after every invalidation or SUMMARY_TTL seconds."""
+    return cache.get_or_set(SUMMARY_KEY, build_dashboard_summary, SUMMARY_TTL)
+
+
+def invalidate_dashboard_summary():
+    cache.delete(SUMMARY_KEY)
+
+
+@receiver([post_save, post_delete], sender=Camera)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_summary_on_change(sender, **kwargs):
+    transaction.on_commit(invalidate_dashboard_summary)
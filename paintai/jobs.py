@@ -0,0 +1,162 @@
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .camera import activate_camera_fn
+from .models import ServiceJob
+from .streamprocess.source.addCamera import (
+    create_new_camera_add_service, delete_nssm_service, start_nssm_service, stop_nssm_service,
+)
+
+STALE_AFTER = timedelta(minutes=15)  # A job running this long belonged to a worker that died
+
+
+def create_camera(cameraname, ipaddr):
+    camera = create_new_camera_add_service(cameraname, ipaddr)
+    return {"cameraid": camera.id, "servicename": camera.servicename}
+
+
+def delete_camera(cameraid):
+    delete_nssm_service(cameraid)
+    return {"cameraid": cameraid}
+
+
+def start_service(servicename):
+    start_nssm_service(servicename)
+    activate_camera_fn(servicename, True)
+    return {"servicename": servicename, "isactivate": True}
+
+
+def stop_service(servicename):
+    stop_nssm_service(servicename)
+    activate_camera_fn(servicename, False)
+    return {"servicename": servicename, "isactivate": False}
+
+
+OPERATIONS = {
+    ServiceJob.CREATE: create_camera,
+    ServiceJob.DELETE: delete_camera,
+    ServiceJob.START: start_service,
+    ServiceJob.STOP: stop_service,
+}
+
+
+def job_data(job):
+    return {
+        "job_id": job.id,
+        "operation": job.operation,
+        "target": job.target,
+        "payload": job.payload,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error,
+        "createdon": job.createdon,
+        "startedon": job.startedon,
+        "finishedon": job.finishedon,
+    }
+
+
+def enqueue_job(operation, target, **payload):
+    """Queues a service operation on `target` (a service name) and wakes the worker once it is committed."""
+    job = ServiceJob.objects.create(operation=operation, target=target, payload=payload)
+    transaction.on_commit(worker.wake)
+    return job
+
+
+def claim_next_job():
+    """
+    Marks the oldest runnable queued job as running and returns it, or None when there is none.
+
+    A job waits while an earlier job of the same service runs. The claim is a conditional UPDATE, so several
+    workers never run the same job.
+    """
+    while True:
+        running = ServiceJob.objects.filter(status=ServiceJob.RUNNING).values('target')
+        job = (
+            ServiceJob.objects.filter(status=ServiceJob.QUEUED)
+            .exclude(target__in=running)
+            .order_by('id')
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        if ServiceJob.objects.filter(pk=job.pk, status=ServiceJob.QUEUED).update(
+            status=ServiceJob.RUNNING, startedon=now
+        ):
+            job.status, job.startedon = ServiceJob.RUNNING, now
+            return job
+
+
+def run_job(job):
+    try:
+        job.result = OPERATIONS[job.operation](**job.payload)
+        job.status = ServiceJob.SUCCEEDED
+    except Exception as e:
+        traceback.print_exc()
+        job.error = f"{type(e).__name__}: {e}"
+        job.status = ServiceJob.FAILED
+    job.finishedon = timezone.now()
+    job.save(update_fields=['result', 'error', 'status', 'finishedon'])
+    return job
+
+
+def fail_stale_jobs():
+    """Fails the jobs left running by a worker that died; they are not retried as they may have half run."""
+    return ServiceJob.objects.filter(
+        status=ServiceJob.RUNNING, startedon__lt=timezone.now() - STALE_AFTER
+    ).update(
+        status=ServiceJob.FAILED,
+        error="Interrupted: the worker stopped while running the job",
+        finishedon=timezone.now(),
+    )
+
+
+def run_pending_jobs():
+    """Runs queued jobs until none is runnable; returns how many ran."""
+    ran = 0
+    while (job := claim_next_job()) is not None:
+        run_job(job)
+        ran += 1
+    return ran
+
+
+class JobWorker:
+    """
+    Background thread of the server process that runs the queued service jobs, oldest first.
+
+    The server starts it (asgi.py, wsgi.py) so jobs queued before a restart run, and every commit that queued a job
+    or a status poll of a queued job wakes it, restarting the thread if it died. Between wake-ups it polls every
+    `poll_interval` seconds for jobs queued by other processes and fails the jobs a dead worker left running.
+    `manage.py run_service_jobs` runs the same loop in a process of its own.
+    """
+
+    def __init__(self, poll_interval=5):
+        self.poll_interval = poll_interval
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def wake(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="service-jobs", daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            self.wakeup.clear()
+            close_old_connections()
+            try:
+                fail_stale_jobs()
+                run_pending_jobs()
+            except Exception:
+                traceback.print_exc()
+            self.wakeup.wait(self.poll_interval)
+
+
+worker = JobWorker()
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .camera import get_active_non_deleted_camera_count_fn, get_total_camera_count_fn
+from .models import Camera, Product, ProductProduction
+from .products import get_total_product_count_fn
+
+
+def production_watermark():
+    """Id of the last stored ProductProduction row; every row of a later batch has a higher id."""
+    return ProductProduction.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def dashboard_snapshot():
+    """
+    Dashboard state the live stream starts from: totals, the production of every product over the last 24 h and
+    the id of the last ProductProduction row it includes, read in one transaction so they are consistent.
+    """
+    from .productprod import production_totals  # productprod publishes through this module
+
+    last_24_hours = timezone.now() - timedelta(hours=24)
+    with transaction.atomic():
+        return {
+            "watermark": production_watermark(),
+            "product_total": get_total_product_count_fn(),
+            "camera_total": get_total_camera_count_fn(),
+            "active_camera_total": get_active_non_deleted_camera_count_fn(),
+            "production_last_day": {
+                row['productid']: row for row in production_totals(last_24_hours, None, group=('productid',))
+            },
+        }
+
+
+def filtered_production(start_date, end_date, camera_id=-1, product_id=-1):
+    """
+    (watermark, totals) of the production page's filter, read in one transaction: the counts events of batches
+    above the watermark are the ones to add to the totals.
+    """
+    from .productprod import get_product_counts_bycamproid
+
+    with transaction.atomic():
+        return production_watermark(), get_product_counts_bycamproid(start_date, end_date, camera_id, product_id)
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def format_snapshot(snapshot):
+    return format_event("snapshot", {**snapshot, "production_last_day": list(snapshot["production_last_day"].values())})
+
+
+class LiveBroadcaster:
+    """
+    In-process fan-out of dashboard events to the Server-Sent Events streams of this server process.
+
+    Ingestion publishes the count deltas of every stored batch once; each open stream gets them from its own bounded
+    queue, so database reads do not grow with the number of dashboards. Streams start from a shared snapshot that is
+    kept current by the same deltas and recomputed from the database every `snapshot_ttl` seconds (so the 24 h
+    window rolls) or after cameras or products changed. A snapshot carries the id of the last ProductProduction row
+    its database read includes and each delta the id of the last row of its batch; as ingests commit one at a time,
+    a batch is wholly at or below a snapshot's watermark or wholly above it. Batches above it are applied whatever
+    order their on_commit callbacks publish them in, and the snapshot remembers which ones it applied so a stream
+    starting from it skips them. A stream that falls `queue_size` events behind is sent a fresh snapshot instead of
+    the events it missed.
+    """
+
+    def __init__(self, queue_size=256, snapshot_ttl=300):
+        self.queue_size = queue_size
+        self.snapshot_ttl = snapshot_ttl
+        self.subscribers = set()  # (event loop, asyncio.Queue) of the open streams; queues hold (watermark, message)
+        self.lock = threading.Lock()
+        self.snapshot_lock = threading.Lock()
+        self.snapshot = None
+        self.applied = set()  # Watermarks of the batches applied to the snapshot since it was read
+        self.snapshot_at = 0.0
+        self.snapshot_version = 0  # Bumped every time the snapshot is recomputed from the database
+
+    def subscribe(self):
+        queue = asyncio.Queue(self.queue_size)
+        with self.lock:
+            self.subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue):
+        with self.lock:
+            self.subscribers = {(loop, q) for loop, q in self.subscribers if q is not queue}
+
+    def publish(self, message):
+        """
+        Sends a (watermark, event) message, or None to resend the snapshot, to every open stream; safe to call from
+        any thread.
+        """
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self.deliver, queue, message)
+            except RuntimeError:  # The stream's event loop is closed
+                self.unsubscribe(queue)
+
+    @staticmethod
+    def deliver(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:  # Slow client: drop what it missed and resynchronise it
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def get_snapshot(self):
+        """
+        Returns (version, watermark, applied batch watermarks, snapshot event), recomputing the snapshot when older
+        than snapshot_ttl or invalidated.
+        """
+        with self.snapshot_lock:
+            if self.snapshot is None or time.monotonic() - self.snapshot_at > self.snapshot_ttl:
+                self.snapshot = dashboard_snapshot()
+                self.applied = set()
+                self.snapshot_at = time.monotonic()
+                self.snapshot_version += 1
+            return (
+                self.snapshot_version, self.snapshot["watermark"], frozenset(self.applied),
+                format_snapshot(self.snapshot),
+            )
+
+    def invalidate_snapshot(self):
+        with self.snapshot_lock:
+            self.snapshot = None
+
+    def publish_snapshot(self):
+        """
+        Recomputes the snapshot once and has every stream start over from it, e.g. after cameras or products changed.
+        """
+        self.invalidate_snapshot()
+        if self.subscribers:
+            self.get_snapshot()
+            self.publish(None)
+
+    def publish_counts(self, watermark, deltas):
+        """
+        Applies the deltas of a committed batch whose last row id is `watermark` to the snapshot and the streams.
+
+        Windows that started before the last 24 h, e.g. replayed from a camera's outbox after an outage, are left out
+        of the snapshot's production_last_day like the snapshot query leaves them out.
+        """
+        last_24_hours = timezone.now() - timedelta(hours=24)
+        with self.snapshot_lock:
+            if self.snapshot is not None and watermark > self.snapshot["watermark"] and watermark not in self.applied:
+                production = self.snapshot["production_last_day"]
+                for delta in deltas:
+                    if delta["starttime"] < last_24_hours:
+                        continue
+                    row = production.setdefault(delta["productid"], {
+                        "productid": delta["productid"], "productid__name": delta["productid__name"], "total_count": 0
+                    })
+                    row["total_count"] += delta["count"]
+                self.applied.add(watermark)
+        self.publish((watermark, format_event("counts", {"watermark": watermark, "deltas": deltas})))
+
+    async def events(self, keepalive=15):
+        """
+        Server-Sent Events of one dashboard: a snapshot, then count deltas as they are ingested. Quiet periods send
+        a keep-alive comment, or the shared snapshot once it was recomputed.
+        """
+        queue = self.subscribe()
+        try:
+            version, watermark, applied, message = await sync_to_async(self.get_snapshot)()
+            yield message
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    current, current_watermark, current_applied, message = await sync_to_async(self.get_snapshot)()
+                    if current != version:
+                        version, watermark, applied = current, current_watermark, current_applied
+                        yield message
+                    else:
+                        yield ": keepalive\n\n"
+                    continue
+                if item is None:  # Missed events or a new snapshot, start over from the snapshot
+                    version, watermark, applied, message = await sync_to_async(self.get_snapshot)()
+                    yield message
+                    continue
+                if item[0] <= watermark or item[0] in applied:  # Already part of the snapshot this stream is at
+                    continue
+                yield item[1]
+        finally:
+            self.unsubscribe(queue)
+
+
+broadcaster = LiveBroadcaster()
+
+
+def publish_counts(productions):
+    """
+    Publishes the count deltas of freshly stored ProductProduction rows, one per camera, product and window.
+
+    Rows of one window (its zones) are summed; windows are kept apart so subscribers can tell each one's time range,
+    as a batch replayed after an outage spans hours.
+
+    Call it through transaction.on_commit so dashboards never see counts that were rolled back.
+    """
+    deltas = {}
+    for production in productions:
+        key = (production.cameraid_id, production.productid_id, production.starttime, production.endtime)
+        delta = deltas.setdefault(key, {
+            "cameraid": production.cameraid_id,
+            "productid": production.productid_id,
+            "productid__name": production.productid.name,
+            "count": 0,
+            "starttime": production.starttime,
+            "endtime": production.endtime,
+        })
+        delta["count"] += production.count
+    if deltas:
+        broadcaster.publish_counts(max(production.id for production in productions), list(deltas.values()))
+
+
+@receiver([post_save, post_delete], sender=Camera)
+@receiver([post_save, post_delete], sender=Product)
+def refresh_dashboard_totals(sender, **kwargs):
+    transaction.on_commit(broadcaster.publish_snapshot)
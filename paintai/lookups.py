@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Camera, Product
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU mapping whose entries expire `ttl` seconds after they were set, holding at most `max_size`
+    entries. Hits, misses and evictions are counted for the metrics endpoint.
+    """
+
+    def __init__(self, ttl=300, max_size=4096):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()  # key -> (expiry, value), least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the cached value, or MISSING when the key is absent or expired."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def replace(self, items):
+        """Swaps the whole content for `items` ((key, value) pairs, later pairs win) in one step."""
+        expiry = time.monotonic() + self.ttl
+        entries = OrderedDict()
+        for key, value in items:
+            entries[key] = (expiry, value)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+        with self.lock:
+            self.entries = entries
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class ModelLookup:
+    """
+    Active rows of a model keyed by one field, bulk loaded with a single query.
+
+    While every active row fits in the cache, a miss means the row does not exist and the database is not asked;
+    the snapshot is reloaded after `ttl` seconds or once a save/delete signal invalidated it. Tables bigger than
+    `max_size` fall back to one query per missed key, and the answer (None included) is cached.
+    """
+
+    def __init__(self, model, key, ttl=300, max_size=4096):
+        self.model = model
+        self.key = key
+        self.cache = TTLCache(ttl, max_size)
+        self.loaded_at = None  # time.monotonic() of the last bulk load, None when invalidated
+        self.complete = False  # The last bulk load held every active row
+        self.generation = 0  # Bumped by every invalidation
+        self.reloads = 0
+
+    def active(self):
+        return self.model.objects.filter(isdeleted=False)
+
+    def preload(self):
+        generation = self.generation
+        rows = list(self.active().order_by('-id')[:self.cache.max_size + 1])
+        self.complete = len(rows) <= self.cache.max_size
+        # Highest ids first so the lowest id wins for duplicate keys, like the former .get()/.filter() lookups
+        self.cache.replace((getattr(row, self.key), row) for row in rows)
+        # A save committed while loading may be missing from the rows; the next lookup loads again
+        self.loaded_at = time.monotonic() if generation == self.generation else None
+        self.reloads += 1
+
+    def invalidate(self):
+        self.generation += 1
+        self.loaded_at = None
+
+    def get(self, key):
+        """Returns the active row with this key, or None."""
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.cache.ttl:
+            self.preload()
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+        if self.complete:
+            return None
+        value = self.active().filter(**{self.key: key}).order_by('id').first()
+        self.cache.set(key, value)
+        return value
+
+    def stats(self):
+        return {**self.cache.stats(), "complete": self.complete, "reloads": self.reloads}
+
+
+products_by_name = ModelLookup(Product, "name")
+cameras_by_id = ModelLookup(Camera, "id")
+
+
+def lookup_stats():
+    return {
+        "products_by_name": products_by_name.stats(),
+        "cameras_by_id": cameras_by_id.stats(),
+    }
+
+
+# Renamed, soft deleted or new rows are visible to the next lookup of this process once committed; other processes
+# pick the change up within the TTL
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_products(sender, **kwargs):
+    transaction.on_commit(products_by_name.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Camera)
+def invalidate_cameras(sender, **kwargs):
+    transaction.on_commit(cameras_by_id.invalidate)
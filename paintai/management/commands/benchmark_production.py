@@ -0,0 +1,121 @@
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from paintai.models import Camera, Product, ProductProduction
+from paintai.productprod import production_totals
+from paintai.rollups import production_sources, rebuild_rollups
+
+ALIAS = "benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills a separate SQLite database with synthetic 1-minute ProductProduction windows and their rollups, then "
+        "times production_totals for the ranges of productprod.py and prints the query plan of every table it reads, "
+        "with and without the ProductProduction indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2_000_000, help="Synthetic ProductProduction rows")
+        parser.add_argument("--cameras", type=int, default=8)
+        parser.add_argument("--products", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per query, the best one is reported")
+        parser.add_argument("--db", help="Benchmark database file, reused if it already holds data")
+
+    def handle(self, *args, **options):
+        path = options["db"] or os.path.join(tempfile.gettempdir(), "paintai_benchmark.sqlite3")
+        connections.databases[ALIAS] = {**connections.databases["default"], "NAME": path}
+        call_command("migrate", database=ALIAS, verbosity=0)
+        self.stdout.write(f"Benchmark database: {path}")
+
+        if not ProductProduction.objects.using(ALIAS).exists():
+            self.populate(options["rows"], options["cameras"], options["products"])
+        total = ProductProduction.objects.using(ALIAS).count()
+        self.stdout.write(f"ProductProduction rows: {total}")
+
+        last = ProductProduction.objects.using(ALIAS).order_by("-starttime").values_list("starttime", flat=True)[0]
+        cases = self.cases(last)
+        self.run_queries("With indexes", cases, options["repeat"])
+
+        indexes = ProductProduction._meta.indexes
+        with connections[ALIAS].schema_editor() as editor:
+            for index in indexes:
+                editor.remove_index(ProductProduction, index)
+        try:
+            self.run_queries("Without the ProductProduction indexes", cases, options["repeat"])
+        finally:
+            with connections[ALIAS].schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(ProductProduction, index)
+
+    def populate(self, rows, cameras, products):
+        """Writes `rows` windows ending now: one row per camera, product and minute, like the camera workers."""
+        now = timezone.now().replace(second=0, microsecond=0)
+        Camera.objects.using(ALIAS).bulk_create(
+            Camera(name=f"BenchCam{i}", servicename=f"BenchService{i}", ipaddr=f"10.0.0.{i}") for i in range(cameras)
+        )
+        Product.objects.using(ALIAS).bulk_create(Product(name=f"Item{i}", yoloid=i) for i in range(products))
+        camera_ids = list(Camera.objects.using(ALIAS).values_list("id", flat=True))
+        product_ids = list(Product.objects.using(ALIAS).values_list("id", flat=True))
+
+        connection = connections[ALIAS]
+        table = ProductProduction._meta.db_table
+        sql = (
+            f'INSERT INTO "{table}" (cameraid_id, productid_id, starttime, endtime, count, zone) '
+            "VALUES (%s, %s, %s, %s, %s, '')"
+        )
+        minutes = -(-rows // (len(camera_ids) * len(product_ids)))
+        self.stdout.write(
+            f"Writing {rows} rows ({minutes} minutes of {len(camera_ids)} cameras x {len(product_ids)} products)"
+        )
+        random.seed(0)
+        written = 0
+        with transaction.atomic(using=ALIAS), connection.cursor() as cursor:
+            for minute in range(minutes, 0, -1):
+                start = connection.ops.adapt_datetimefield_value(now - timedelta(minutes=minute))
+                end = connection.ops.adapt_datetimefield_value(now - timedelta(minutes=minute - 1))
+                batch = [
+                    (camera_id, product_id, start, end, random.randint(0, 12))
+                    for camera_id in camera_ids
+                    for product_id in product_ids
+                ][: rows - written]
+                cursor.executemany(sql, batch)
+                written += len(batch)
+        # No ANALYZE: the server's database has no sqlite_stat1 either, and the plans should be the ones it gets
+        rebuild_rollups(using=ALIAS)
+
+    def cases(self, last):
+        """(name, start, end, filters, group) of the production_totals calls in productprod.py."""
+        camera_id = Camera.objects.using(ALIAS).values_list("id", flat=True).first()
+        day = (last - timedelta(days=1), last + timedelta(minutes=1))
+        month = (last - timedelta(days=30), last + timedelta(minutes=1))
+        return [
+            ("get_product_counts, last day", *day, Q(), ("cameraid", "productid")),
+            ("get_product_counts, last 30 days", *month, Q(), ("cameraid", "productid")),
+            ("get_product_counts_bycamproid, one camera, last day", *day, Q(cameraid=camera_id),
+             ("cameraid", "productid")),
+            ("get_productProduction_top_five_last_day", day[0], None, Q(), ("productid",)),
+        ]
+
+    def run_queries(self, title, cases, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{title}"))
+        for name, start, end, filters, group in cases:
+            timings = []
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                production_totals(start, end, filters, group, using=ALIAS)
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(self.style.SUCCESS(f"{name}: {min(timings) * 1000:.1f} ms"))
+            for source in production_sources(start, end, filters, using=ALIAS):
+                self.stdout.write(f"  {source.model.__name__}:")
+                plan = source.values(*group).annotate(total_count=Sum("count")).order_by().explain()
+                self.stdout.write("\n".join(f"    {line}" for line in plan.splitlines()))
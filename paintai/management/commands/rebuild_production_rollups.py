@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from paintai.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the hourly and daily production rollups from the raw ProductProduction rows, e.g. after a "
+        "backfill or a manual fix of raw rows. Without --start/--end every bucket is rebuilt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="ISO 8601 date or datetime, widened to the start of its UTC day")
+        parser.add_argument("--end", help="ISO 8601 date or datetime, widened to the end of its UTC day")
+        parser.add_argument("--camera", type=int, help="Only rebuild the rollups of this camera id")
+        parser.add_argument("--product", type=int, help="Only rebuild the rollups of this product id")
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.fromisoformat(options["start"]) if options["start"] else None
+            end = datetime.fromisoformat(options["end"]) if options["end"] else None
+        except ValueError as e:
+            raise CommandError(e)
+        filters = Q()
+        if options["camera"] is not None:
+            filters &= Q(cameraid=options["camera"])
+        if options["product"] is not None:
+            filters &= Q(productid=options["product"])
+
+        written = rebuild_rollups(start, end, filters)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written['HourlyProduction']} hourly and {written['DailyProduction']} daily buckets"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from paintai.jobs import JobWorker, fail_stale_jobs, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the queued camera service jobs (create, delete, start, stop) in this process, e.g. when the web server "
+        "runs without its background worker or to finish jobs queued before a restart."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run the pending jobs and exit instead of polling")
+        parser.add_argument("--poll-interval", type=float, default=5, help="Seconds between polls for new jobs")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            fail_stale_jobs()
+            ran = run_pending_jobs()
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} service jobs"))
+            return
+        JobWorker(poll_interval=options["poll_interval"]).run()
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("paintai", "0006_alter_camera_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productproduction",
+            name="zone",
+            field=models.CharField(blank=True, default="", max_length=50),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("paintai", "0007_productproduction_zone"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="camera",
+            index=models.Index(
+                condition=models.Q(("isdeleted", False)), fields=["servicename"], name="camera_live_service_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="camera",
+            index=models.Index(
+                condition=models.Q(("isdeleted", False)), fields=["isactivate"], name="camera_live_active_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(condition=models.Q(("isdeleted", False)), fields=["name"], name="product_live_name_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="productproduction",
+            index=models.Index(
+                fields=["starttime", "cameraid", "productid", "endtime", "count"],
+                name="production_start_cam_prod_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productproduction",
+            index=models.Index(
+                fields=["cameraid", "starttime", "productid", "endtime", "count"], name="production_cam_start_idx"
+            ),
+        ),
+    ]
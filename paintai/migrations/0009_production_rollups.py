@@ -0,0 +1,110 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    """Builds the rollups of the rows stored before this migration; reads take whole hours and days from them."""
+    from paintai.rollups import rebuild_rollups
+
+    rebuild_rollups(
+        models=(
+            apps.get_model("paintai", "ProductProduction"),
+            apps.get_model("paintai", "HourlyProduction"),
+            apps.get_model("paintai", "DailyProduction"),
+        ),
+        using=schema_editor.connection.alias,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("paintai", "0008_production_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyProduction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("count", models.PositiveBigIntegerField(default=0)),
+                ("lastendtime", models.DateTimeField()),
+                (
+                    "cameraid",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="paintai.camera",
+                    ),
+                ),
+                (
+                    "productid",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="paintai.product",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("bucket", "cameraid", "productid"),
+                        name="daily_production_bucket_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="HourlyProduction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("count", models.PositiveBigIntegerField(default=0)),
+                ("lastendtime", models.DateTimeField()),
+                (
+                    "cameraid",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="paintai.camera",
+                    ),
+                ),
+                (
+                    "productid",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="paintai.product",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("bucket", "cameraid", "productid"),
+                        name="hourly_production_bucket_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
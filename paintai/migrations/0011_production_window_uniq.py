@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-18 16:05
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Q
+
+
+def remove_resent_windows(apps, schema_editor):
+    """
+    Deletes the copies of windows a camera posted again after losing the server's answer, keeping the first row,
+    and rebuilds the rollups of their days so the constraint below can be added.
+    """
+    from paintai.rollups import floor_day, rebuild_rollups
+
+    ProductProduction = apps.get_model("paintai", "ProductProduction")
+    using = schema_editor.connection.alias
+    models_ = (
+        ProductProduction,
+        apps.get_model("paintai", "HourlyProduction"),
+        apps.get_model("paintai", "DailyProduction"),
+    )
+    duplicated = (
+        ProductProduction.objects.using(using)
+        .values("cameraid", "starttime", "productid", "zone")
+        .annotate(rows=Count("id"), first=Min("id"))
+        .filter(rows__gt=1)
+    )
+    for window in list(duplicated):  # Read before deleting: SQLite cursors see the deletes
+        ProductProduction.objects.using(using).filter(
+            cameraid=window["cameraid"],
+            starttime=window["starttime"],
+            productid=window["productid"],
+            zone=window["zone"],
+        ).exclude(id=window["first"]).delete()
+        day = floor_day(window["starttime"])
+        rebuild_rollups(
+            day,
+            day + timedelta(days=1),
+            Q(cameraid=window["cameraid"], productid=window["productid"]),
+            models=models_,
+            using=using,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("paintai", "0010_servicejob"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_resent_windows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="productproduction",
+            constraint=models.UniqueConstraint(
+                fields=("cameraid", "starttime", "productid", "zone"),
+                name="production_window_uniq",
+            ),
+        ),
+    ]
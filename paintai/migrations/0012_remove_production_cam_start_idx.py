@@ -0,0 +1,16 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("paintai", "0011_production_window_uniq"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="productproduction",
+            name="production_cam_start_idx",
+        ),
+    ]
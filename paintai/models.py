@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 # Create your models here.
 class Camera(models.Model):
@@ -9,6 +10,13 @@ class Camera(models.Model):
     createdon = models.DateTimeField(default=timezone.now)
     isactivate = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Only live cameras are ever looked up or counted
+            models.Index(fields=["servicename"], condition=Q(isdeleted=False), name="camera_live_service_idx"),
+            models.Index(fields=["isactivate"], condition=Q(isdeleted=False), name="camera_live_active_idx"),
+        ]
+
 
 class Product(models.Model):
     name = models.CharField(max_length=100)
@@ -16,9 +24,90 @@ class Product(models.Model):
     isdeleted = models.BooleanField(default=False)
     createdon = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["name"], condition=Q(isdeleted=False), name="product_live_name_idx"),
+        ]
+
 class ProductProduction(models.Model):
     cameraid = models.ForeignKey(Camera,on_delete=models.CASCADE)
     productid = models.ForeignKey(Product,on_delete=models.CASCADE)
     starttime = models.DateTimeField()
     endtime = models.DateTimeField()
     count = models.PositiveIntegerField(default=0)
+    zone = models.CharField(max_length=50, default="", blank=True)
+
+    class Meta:
+        indexes = [
+            # Time-range aggregations grouped by camera and product; endtime and count are trailing columns so the
+            # aggregates are answered from the index alone. The same aggregations filtered on one camera search
+            # production_window_uniq below.
+            models.Index(
+                fields=["starttime", "cameraid", "productid", "endtime", "count"], name="production_start_cam_prod_idx"
+            ),
+        ]
+        constraints = [
+            # One row per camera window, product and zone: a window the camera resends because the answer to the
+            # first post was lost is not stored twice
+            models.UniqueConstraint(
+                fields=["cameraid", "starttime", "productid", "zone"], name="production_window_uniq"
+            ),
+        ]
+
+
+class ProductionRollup(models.Model):
+    """ProductProduction counts summed per camera, product and UTC bucket, kept up to date by ingestion."""
+    cameraid = models.ForeignKey(Camera, on_delete=models.CASCADE, related_name="+")
+    productid = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    bucket = models.DateTimeField()  # Start of the bucket; rows belong to the bucket their starttime falls in
+    count = models.PositiveBigIntegerField(default=0)
+    lastendtime = models.DateTimeField()  # Latest endtime of the rows in the bucket
+
+    class Meta:
+        abstract = True
+
+
+class HourlyProduction(ProductionRollup):
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["bucket", "cameraid", "productid"], name="hourly_production_bucket_uniq"),
+        ]
+
+
+class DailyProduction(ProductionRollup):
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["bucket", "cameraid", "productid"], name="daily_production_bucket_uniq"),
+        ]
+
+
+class ServiceJob(models.Model):
+    """A camera service operation queued by the views and run by the job worker (paintai/jobs.py)."""
+    CREATE = "create"
+    DELETE = "delete"
+    START = "start"
+    STOP = "stop"
+    OPERATIONS = [(CREATE, "Create"), (DELETE, "Delete"), (START, "Start"), (STOP, "Stop")]
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUSES = [(QUEUED, "Queued"), (RUNNING, "Running"), (SUCCEEDED, "Succeeded"), (FAILED, "Failed")]
+
+    operation = models.CharField(max_length=10, choices=OPERATIONS)
+    target = models.CharField(max_length=50)  # Service name; jobs of one service run one at a time, in order
+    payload = models.JSONField(default=dict)  # Keyword arguments of the operation
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(default="", blank=True)
+    createdon = models.DateTimeField(default=timezone.now)
+    startedon = models.DateTimeField(null=True, blank=True)
+    finishedon = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="servicejob_status_idx"),
+        ]
@@ -1,53 +1,31 @@
 # views.py or utils.py
 from .models import ProductProduction, Camera, Product
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db import DEFAULT_DB_ALIAS, transaction
 from django.utils import timezone
 # from django.db.models import Sum
 from django.db.models import Q, Sum
+from django.db.models.functions import Trunc
+from .rollups import add_to_rollups, production_sources, refresh_rollups
+from .lookups import cameras_by_id, products_by_name
+from .live import publish_counts
+from .dashboard import invalidate_dashboard_summary
+from functools import partial
+import heapq
 
-# Initialize the in-memory cache
-product_cache = {}
+# Products and cameras are served from the bounded, signal-invalidated caches in lookups.py
 def get_product_id_from_cache_or_db(item_name: str):
-    # Check if the item name is already in the cache
-    if item_name in product_cache:
-        print("Product Cache hit")
-        return product_cache[item_name]
-    
-    # If not in cache, query the database
-    try:
-        item = Product.objects.get(name=item_name,isdeleted=False)
-        # Store the result in the cache
-        product_cache[item_name] = item
-        print("Product Cache miss - Querying database")
-        return item
-    except Product.DoesNotExist:
-        print("Product not found in the database")
-        return None
-    
-camera_cache = {}
+    return products_by_name.get(item_name)
+
+
 def get_camera_id_from_cache_or_db(id):
-    # Check if the item name is already in the cache
-    if id in camera_cache:
-        print("Camera Cache hit")
-        return camera_cache[id]
-    
-    # If not in cache, query the database
-    try:
-        item = Camera.objects.get(pk=id,isdeleted=False)
-        # Store the result in the cache
-        camera_cache[id] = item
-        print("Camera Cache miss - Querying database")
-        return item
-    except Camera.DoesNotExist:
-        print("Camera not found in the database")
-        return None
+    return cameras_by_id.get(id)
 
 
 # Create a new ProductProduction record
-def create_product_production(camera_id, product_name, starttime, endtime, count=0):
+def create_product_production(camera_id, product_name, starttime, endtime, count=0, zone=""):
     try:
         # Fetch Camera and Product instances
-        print(camera_id,product_name)
         cameraid = get_camera_id_from_cache_or_db(camera_id) #Camera.objects.get(id=camera_id)
         productid = get_product_id_from_cache_or_db(product_name) #Product.objects.get(id=product_id)
 
@@ -57,9 +35,14 @@ def create_product_production(camera_id, product_name, starttime, endtime, count
             productid=productid,
             starttime=starttime,
             endtime=endtime,
-            count=count
+            count=count,
+            zone=zone
         )
-        production.save()
+        with transaction.atomic():
+            production.save()
+            add_to_rollups([production])
+            transaction.on_commit(partial(publish_counts, [production]))
+            transaction.on_commit(invalidate_dashboard_summary)
         return production
     except Camera.DoesNotExist:
         print(f"Camera with ID {camera_id} not found.")
@@ -69,6 +52,112 @@ def create_product_production(camera_id, product_name, starttime, endtime, count
         print(f"Error creating ProductProduction: {e}")
         return None
 
+def parse_window_time(value, field):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an ISO 8601 timestamp, got {value!r}")
+    # Cameras send naive local timestamps; they are stored in the default time zone, as before
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def parse_camera_window(window):
+    """Validates one camera window and returns (cameraid, starttime, endtime, {zone: {product: count}})."""
+    if not isinstance(window, dict):
+        raise ValueError(f"Window must be an object, got {type(window).__name__}")
+    window = dict(window)
+    try:
+        cameraid = int(window.pop('cameraid'))
+        starttime = parse_window_time(window.pop('starttime'), 'starttime')
+        endtime = parse_window_time(window.pop('endtime'), 'endtime')
+    except KeyError as e:
+        raise ValueError(f"Window is missing {e}")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid window header: {e}")
+    if endtime < starttime:
+        raise ValueError(f"Window ends before it starts: {starttime} > {endtime}")
+
+    # Cameras with named counting zones send {"zones": {zone: {product: counts}}} instead of products
+    zones = window.pop('zones', None) or {"": window}
+    counts = {}
+    for zone, products in zones.items():
+        if not isinstance(products, dict):
+            raise ValueError(f"Counts of zone {zone!r} must be an object")
+        counts[zone] = {}
+        for product_name, value in products.items():
+            if not isinstance(value, dict) or not all(isinstance(v, int) and v >= 0 for v in value.values()):
+                raise ValueError(f"Counts of {product_name!r} must be non-negative integers, got {value!r}")
+            counts[zone][product_name] = sum(value.values())
+    return cameraid, starttime, endtime, counts
+
+
+# Store a batch of camera windows
+def ingest_camera_windows(windows):
+    """
+    Stores count windows posted by camera workers in one transaction.
+
+    The whole payload is validated before anything is written, cameras and products are resolved from the lookup
+    caches without touching the database, and all rows are written with a single bulk_create. Windows of unknown or
+    deleted cameras and counts of unknown products are skipped, like before, and reported back.
+
+    Camera workers resend a batch when the answer to a post is lost, so rows of windows already stored (same camera,
+    starttime, product and zone) are skipped and reported as duplicates; the unique constraint backs this up.
+
+    Returns:
+        dict: Number of windows and rows stored, and what was skipped.
+    """
+    parsed = [parse_camera_window(window) for window in windows]
+
+    rows = []
+    skipped_cameras = set()
+    skipped_products = set()
+    for cameraid, starttime, endtime, counts in parsed:
+        if cameras_by_id.get(cameraid) is None:
+            skipped_cameras.add(cameraid)
+            continue
+        for zone, zone_counts in counts.items():
+            for product_name, count in zone_counts.items():
+                product = products_by_name.get(product_name)
+                if product is None:
+                    skipped_products.add(product_name)
+                    continue
+                rows.append(ProductProduction(
+                    cameraid_id=cameraid,
+                    productid=product,
+                    starttime=starttime,
+                    endtime=endtime,
+                    count=count,
+                    zone=zone
+                ))
+
+    with transaction.atomic():
+        stored = set()
+        if rows:
+            stored = set(
+                ProductProduction.objects.filter(
+                    cameraid__in={row.cameraid_id for row in rows}, starttime__in={row.starttime for row in rows}
+                ).values_list('cameraid', 'starttime', 'productid', 'zone')
+            )
+        fresh = []
+        for row in rows:
+            key = (row.cameraid_id, row.starttime, row.productid_id, row.zone)
+            if key not in stored:
+                stored.add(key)
+                fresh.append(row)
+        duplicates = len(rows) - len(fresh)
+        rows = fresh
+        ProductProduction.objects.bulk_create(rows, batch_size=500)
+        add_to_rollups(rows)  # Hourly and daily totals stay in step with the raw rows
+        transaction.on_commit(partial(publish_counts, rows))  # Live dashboards get the deltas once committed
+        transaction.on_commit(invalidate_dashboard_summary)
+    return {
+        "windows": len(parsed),
+        "rows": len(rows),
+        "duplicates": duplicates,
+        "skipped_cameras": sorted(skipped_cameras),
+        "skipped_products": sorted(skipped_products),
+    }
+
 # Read ProductProduction by ID
 def get_product_production_by_id(production_id):
     try:
@@ -81,6 +170,14 @@ def get_product_production_by_id(production_id):
 def get_all_product_productions_fn():
     return ProductProduction.objects.all()
 
+# Columns read straight from the table; FK ids come from cameraid_id/productid_id without loading the related rows
+PRODUCTION_FIELDS = ('id', 'cameraid_id', 'productid_id', 'count', 'starttime', 'endtime', 'zone')
+
+def get_product_productions_after(after_id=0, limit=None):
+    """ProductProduction rows with id > after_id in id order, as dicts; keyset pagination on the primary key."""
+    productions = ProductProduction.objects.filter(id__gt=after_id).order_by('id').values(*PRODUCTION_FIELDS)
+    return productions[:limit] if limit is not None else productions
+
 def get_product_productions_by_camera(camera_id):
     return ProductProduction.objects.filter(cameraid=camera_id)
 
@@ -91,13 +188,18 @@ def get_product_productions_by_product(product_id):
 def update_product_production(production_id, starttime=None, endtime=None, count=None):
     try:
         production = ProductProduction.objects.get(id=production_id)
+        previous = ProductProduction(cameraid_id=production.cameraid_id, productid_id=production.productid_id,
+                                     starttime=production.starttime)
         if starttime:
             production.starttime = starttime
         if endtime:
             production.endtime = endtime
         if count is not None:
             production.count = count
-        production.save()
+        with transaction.atomic():
+            production.save()
+            refresh_rollups([previous, production])
+            transaction.on_commit(invalidate_dashboard_summary)
         return production
     except ProductProduction.DoesNotExist:
         print(f"ProductProduction with ID {production_id} not found.")
@@ -107,7 +209,10 @@ def update_product_production(production_id, starttime=None, endtime=None, count
 def delete_product_production(production_id):
     try:
         production = ProductProduction.objects.get(id=production_id)
-        production.delete()
+        with transaction.atomic():
+            production.delete()
+            refresh_rollups([production])
+            transaction.on_commit(invalidate_dashboard_summary)
         print(f"ProductProduction with ID {production_id} deleted successfully.")
         return True
     except ProductProduction.DoesNotExist:
@@ -115,45 +220,90 @@ def delete_product_production(production_id):
         return False
 
 
-def get_product_counts(start_date, end_date):
-    results = (
-        ProductProduction.objects
-        .filter(starttime__gte=start_date, endtime__lte=end_date)  # Filter by date range
-        .values('cameraid','productid','productid__name')  # Group by productid
-        .annotate(total_count=Sum('count'))  # Sum up the count field
-    )
-    print(results)
-    return results
+def production_totals(start_date, end_date, filters=Q(), group=('cameraid', 'productid'), using=DEFAULT_DB_ALIAS):
+    """
+    Sums ProductProduction counts over a time range, grouped by `group`.
+
+    Whole hours and days are read from the rollup tables and only the edges of the range from the raw 1-minute rows,
+    so month-long ranges touch hundreds of rows. The totals are the same as summing the raw rows with
+    starttime >= start_date and endtime <= end_date (no upper bound when end_date is None).
+
+    Returns:
+        list: {<group fields>, 'productid__name', 'total_count'} dicts, ordered by the group fields.
+    """
+    totals = {}
+    for source in production_sources(start_date, end_date, filters, using=using):
+        for row in source.values(*group).annotate(total_count=Sum('count')).order_by():
+            key = tuple(row[field] for field in group)
+            totals[key] = totals.get(key, 0) + row['total_count']
+    names = dict(Product.objects.using(using).filter(id__in={key[group.index('productid')] for key in totals})
+                 .values_list('id', 'name'))
+    return [
+        {**dict(zip(group, key)), 'productid__name': names.get(key[group.index('productid')]), 'total_count': total}
+        for key, total in sorted(totals.items())
+    ]
+
+
+def merge_bucket_streams(streams):
+    """Merges ((bucket, cameraid, productid), row) streams sorted by key, adding up rows with the same key."""
+    current = None
+    for key, row in heapq.merge(*streams, key=lambda item: item[0]):
+        if current is not None and key == current[0]:
+            current[1]['total_count'] += row['total_count']
+            continue
+        if current is not None:
+            yield current[1]
+        current = (key, {'bucket': key[0], 'cameraid': key[1], 'productid': key[2],
+                         'productid__name': row['productid__name'], 'total_count': row['total_count']})
+    if current is not None:
+        yield current[1]
+
+
+def production_buckets(start_date, end_date, granularity, filters=Q(), chunk_size=2000):
+    """
+    ProductProduction counts per hour or day bucket, camera and product over a time range, in bucket order.
 
+    Each source of `production_sources` is grouped per bucket in SQL and read with a chunked iterator; the sorted
+    streams are merged and buckets split between sources (at the edges of the rollup span) are added up, so memory
+    stays bounded whatever the length of the range. Buckets are UTC hours or days.
+
+    Returns:
+        (Iterator[dict]): {'bucket', 'cameraid', 'productid', 'productid__name', 'total_count'} rows.
+    """
+    if granularity not in ('hour', 'day'):
+        raise ValueError(f"granularity must be 'hour' or 'day', got {granularity!r}")
+    streams = []
+    for source in production_sources(start_date, end_date, filters, daily=granularity == 'day'):
+        field = 'starttime' if source.model is ProductProduction else 'bucket'
+        rows = (
+            source.annotate(slot=Trunc(field, granularity, tzinfo=dt_timezone.utc))
+            .values('slot', 'cameraid', 'productid', 'productid__name')
+            .annotate(total_count=Sum('count'))
+            .order_by('slot', 'cameraid', 'productid')
+            .iterator(chunk_size=chunk_size)
+        )
+        streams.append(((row['slot'], row['cameraid'], row['productid']), row) for row in rows)
+
+    return merge_bucket_streams(streams)
+
+
+def get_product_counts(start_date, end_date):
+    return production_totals(start_date, end_date)
 
 
 def get_product_counts_bycamproid(start_date, end_date, camera_id=-1, product_id=-1):
     # Build the filter criteria dynamically
-    filters = Q(starttime__gte=start_date, endtime__lte=end_date)
+    filters = Q()
     if camera_id != -1:
         filters &= Q(cameraid=camera_id)
     if product_id != -1:
         filters &= Q(productid=product_id)
-    
-    results = (
-        ProductProduction.objects
-        .filter(filters)  # Apply the dynamic filters
-        .values('cameraid', 'productid', 'productid__name')  # Group by productid
-        .annotate(total_count=Sum('count'))  # Sum up the count field
-    )
-    print(results)
-    return results
-
-
-
+    return production_totals(start_date, end_date, filters)
 
 
 def get_productProduction_top_five_last_day():
     last_24_hours = timezone.now() - timedelta(hours=24)
-    
-    # Query to get the top 5 products based on count in the last 24 hours
-    top_selling_products = (ProductProduction.objects.filter(starttime__gte=last_24_hours)
-                            .values('productid','productid__name')
-                            .annotate(total_count=Sum('count'))
-                            .order_by('-total_count')[:5])
-    return top_selling_products
\ No newline at end of file
+
+    # Top 5 products based on count in the last 24 hours
+    totals = production_totals(last_24_hours, None, group=('productid',))
+    return sorted(totals, key=lambda row: -row['total_count'])[:5]
@@ -30,3 +30,14 @@ def soft_delete_product_fn(product_id):
 def get_total_product_count_fn():
     total_count = Product.objects.filter(isdeleted=False).count()
     return total_count
+
+
+# Async twins for the async views
+async def aget_product_by_id_fn(product_id):
+    return await Product.objects.aget(pk=product_id, isdeleted=False)
+
+async def aget_product_by_name_fn(product_name):
+    return await Product.objects.aget(name=product_name, isdeleted=False)
+
+async def aget_total_product_count_fn():
+    return await Product.objects.filter(isdeleted=False).acount()
@@ -0,0 +1,195 @@
+from datetime import timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import DailyProduction, HourlyProduction, ProductProduction
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+
+def aware(value):
+    """Reads naive datetimes in the default time zone, like the ORM does for filters."""
+    if value is None or timezone.is_aware(value):
+        return value
+    return timezone.make_aware(value)
+
+
+# Buckets are aligned in UTC so every day is made of whole hours, whatever the time zone setting
+def floor_hour(value):
+    return aware(value).astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(value):
+    return floor_hour(value).replace(hour=0)
+
+
+def ceil_hour(value):
+    floor = floor_hour(value)
+    return floor if floor == aware(value) else floor + HOUR
+
+
+def ceil_day(value):
+    floor = floor_day(value)
+    return floor if floor == aware(value) else floor + DAY
+
+
+def add_to_rollups(productions):
+    """
+    Adds freshly stored ProductProduction rows to the hourly and daily rollups.
+
+    Must run in the transaction that stored the rows, after they were written, so concurrent ingestions cannot
+    interleave their read-modify-write of the same buckets.
+    """
+    for model, floor in ((HourlyProduction, floor_hour), (DailyProduction, floor_day)):
+        deltas = {}
+        for production in productions:
+            key = (production.cameraid_id, production.productid_id, floor(production.starttime))
+            count, lastendtime = deltas.get(key, (0, production.endtime))
+            deltas[key] = (count + production.count, max(lastendtime, production.endtime))
+        if not deltas:
+            continue
+
+        buckets = [bucket for _, _, bucket in deltas]
+        existing = model.objects.filter(
+            bucket__gte=min(buckets),
+            bucket__lte=max(buckets),
+            cameraid__in={camera for camera, _, _ in deltas},
+            productid__in={product for _, product, _ in deltas},
+        )
+        changed = []
+        for rollup in existing:
+            delta = deltas.pop((rollup.cameraid_id, rollup.productid_id, rollup.bucket), None)
+            if delta is not None:
+                rollup.count += delta[0]
+                rollup.lastendtime = max(rollup.lastendtime, delta[1])
+                changed.append(rollup)
+        model.objects.bulk_update(changed, ['count', 'lastendtime'], batch_size=500)
+        model.objects.bulk_create(
+            [
+                model(cameraid_id=camera, productid_id=product, bucket=bucket, count=count, lastendtime=lastendtime)
+                for (camera, product, bucket), (count, lastendtime) in deltas.items()
+            ],
+            batch_size=500,
+        )
+
+
+def rebuild_rollups(start=None, end=None, filters=Q(), batch_size=5000, models=None, using=DEFAULT_DB_ALIAS):
+    """
+    Recomputes the rollups from the raw rows, for backfills and after raw rows were edited or deleted.
+
+    The range is widened to whole UTC days so no bucket is left half rebuilt. `filters` restricts the rebuild to
+    some cameras or products, e.g. Q(cameraid=2). Migrations pass their historical (ProductProduction,
+    HourlyProduction, DailyProduction) models as `models`; `using` is the database alias.
+
+    Returns:
+        dict: Number of hourly and daily buckets written.
+    """
+    start = floor_day(aware(start)) if start is not None else None
+    end = ceil_day(aware(end)) if end is not None else None
+    bounds = Q()
+    if start is not None:
+        bounds &= Q(bucket__gte=start)
+    if end is not None:
+        bounds &= Q(bucket__lt=end)
+    raw_model, hourly_model, daily_model = models or (ProductProduction, HourlyProduction, DailyProduction)
+    raw = raw_model.objects.using(using).filter(filters)
+    if start is not None:
+        raw = raw.filter(starttime__gte=start)
+    if end is not None:
+        raw = raw.filter(starttime__lt=end)
+
+    written = {}
+    with transaction.atomic(using=using):
+        for model, trunc in ((hourly_model, TruncHour), (daily_model, TruncDay)):
+            model.objects.using(using).filter(bounds & filters).delete()
+            rows = (
+                raw.annotate(bucket=trunc('starttime', tzinfo=dt_timezone.utc))
+                .values('cameraid', 'productid', 'bucket')
+                .annotate(total_count=Sum('count'), lastendtime=Max('endtime'))
+                .order_by()
+                .iterator(chunk_size=batch_size)
+            )
+            written[model.__name__] = 0
+            while batch := list(islice(rows, batch_size)):
+                model.objects.using(using).bulk_create(
+                    model(
+                        cameraid_id=row['cameraid'],
+                        productid_id=row['productid'],
+                        bucket=row['bucket'],
+                        count=row['total_count'],
+                        lastendtime=row['lastendtime'],
+                    )
+                    for row in batch
+                )
+                written[model.__name__] += len(batch)
+    return written
+
+
+def refresh_rollups(productions):
+    """Rebuilds the days of the given rows for their camera and product after they were edited or deleted."""
+    for production in productions:
+        day = floor_day(production.starttime)
+        rebuild_rollups(day, day + DAY, Q(cameraid=production.cameraid_id, productid=production.productid_id))
+
+
+def production_sources(start, end, filters=Q(), daily=True, using=DEFAULT_DB_ALIAS):
+    """
+    Splits the range of an aggregation over the cheapest tables that answer it exactly.
+
+    Raw rows count when starttime >= start and endtime <= end. A rollup bucket is used whole when it starts at or
+    after `start` and all its rows ended by `end` (its lastendtime); the covered hours form one contiguous span, whole
+    days inside it are read from DailyProduction, the remaining hours from HourlyProduction, and the edges before and
+    after the span from the raw 1-minute rows.
+
+    Args:
+        start (datetime): Inclusive lower bound on starttime.
+        end (datetime | None): Inclusive upper bound on endtime, None for no upper bound.
+        filters (Q): Extra filters on cameraid and productid, valid on the raw and the rollup tables.
+        daily (bool): Read whole days from DailyProduction; False keeps hourly resolution.
+        using (str): Database alias, e.g. the benchmark database of `manage.py benchmark_production`.
+
+    Returns:
+        (List[QuerySet]): Querysets with cameraid, productid and count fields whose counts add up to the range, in
+            time order: raw rows before the span, rollups of the span, raw rows after it.
+    """
+    start, end = aware(start), aware(end)
+    hourly = HourlyProduction.objects.using(using)
+    cover_start = ceil_hour(start)
+    cover_end = floor_hour(end if end is not None else timezone.now())
+    if end is not None and cover_start < cover_end:
+        # The first bucket holding a row that ended after `end` closes the span
+        unfinished = (
+            hourly.filter(filters, bucket__gte=cover_start, bucket__lt=cover_end, lastendtime__gt=end)
+            .aggregate(first=Min('bucket'))['first']
+        )
+        if unfinished is not None:
+            cover_end = unfinished
+
+    raw = ProductProduction.objects.using(using).filter(filters)
+    if end is not None:
+        raw = raw.filter(endtime__lte=end)
+    # Every raw range gets exactly one lower and one upper bound on starttime: SQLite searches
+    # production_start_cam_prod_idx with the first bounds it finds, and without an upper bound it prefers scanning a
+    # whole foreign key index to sorting the GROUP BY. A window starts before it ends, so starttime <= end drops no
+    # row; with no end the newest window closes the range.
+    last_start = end if end is not None else (
+        ProductProduction.objects.using(using).aggregate(last=Max('starttime'))['last'] or start
+    )
+    if cover_start >= cover_end:
+        return [raw.filter(starttime__gte=start, starttime__lte=last_start)]
+
+    sources = [raw.filter(starttime__gte=start, starttime__lt=cover_start)]
+    day_start, day_end = ceil_day(cover_start), floor_day(cover_end)
+    if daily and day_start < day_end:
+        sources.append(hourly.filter(filters, bucket__gte=cover_start, bucket__lt=day_start))
+        sources.append(DailyProduction.objects.using(using).filter(filters, bucket__gte=day_start, bucket__lt=day_end))
+        sources.append(hourly.filter(filters, bucket__gte=day_end, bucket__lt=cover_end))
+    else:
+        sources.append(hourly.filter(filters, bucket__gte=cover_start, bucket__lt=cover_end))
+    sources.append(raw.filter(starttime__gte=cover_end, starttime__lte=last_start))
+    return sources
@@ -0,0 +1,161 @@
+from datetime import timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import ExtractMinute, Trunc
+
+from .models import ProductProduction
+from .productprod import production_buckets
+from .rollups import aware, floor_day, floor_hour
+
+# Bucket name -> length; buckets are aligned in UTC like the rollups
+BUCKETS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+MAX_BUCKETS = 200_000  # Buckets per series before downsampling; about 4.5 months of 1m buckets
+
+
+def choose_bucket(start, end, max_points):
+    """Finest bucket that covers the range in at most `max_points` buckets, 1d when none does."""
+    for name, size in BUCKETS.items():
+        if (end - start) / size <= max_points:
+            return name
+    return "1d"
+
+
+def floor_bucket(value, bucket):
+    if bucket == "1d":
+        return floor_day(value)
+    hour = floor_hour(value)
+    if bucket == "1h":
+        return hour
+    size = BUCKETS[bucket]
+    return hour + (value - hour) // size * size
+
+
+def bucket_rows(start, end, bucket, filters):
+    """
+    Yields (bucket start, cameraid, productid, product name, count) rows grouped in the database.
+
+    Hour and day buckets come from the rollup tables with raw rows at the edges; minute buckets are grouped from the
+    raw rows. Five-minute buckets are grouped by hour and minute // 5, which every database can compute.
+    """
+    if bucket in ("1h", "1d"):
+        for row in production_buckets(start, end, "hour" if bucket == "1h" else "day", filters):
+            yield row['bucket'], row['cameraid'], row['productid'], row['productid__name'], row['total_count']
+        return
+
+    size = BUCKETS[bucket]
+    rows = ProductProduction.objects.filter(filters, starttime__gte=start, endtime__lte=end)
+    if bucket == "1m":
+        rows = rows.annotate(slot=Trunc('starttime', 'minute', tzinfo=dt_timezone.utc), step=Value(0))
+    else:
+        rows = rows.annotate(
+            slot=Trunc('starttime', 'hour', tzinfo=dt_timezone.utc),
+            step=ExtractMinute('starttime', tzinfo=dt_timezone.utc) / Value(size.seconds // 60),
+        )
+    rows = (
+        rows.values('slot', 'step', 'cameraid', 'productid', 'productid__name')
+        .annotate(total_count=Sum('count'))
+        .order_by()
+        .iterator(chunk_size=2000)
+    )
+    for row in rows:
+        yield (row['slot'] + row['step'] * size, row['cameraid'], row['productid'], row['productid__name'],
+               row['total_count'])
+
+
+def lttb(values, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of an evenly spaced series.
+
+    Keeps the first and last points and, from each of `threshold - 2` equal slices in between, the point forming the
+    largest triangle with the point kept before it and the mean of the next slice, which preserves peaks and dips.
+
+    Args:
+        values (numpy.ndarray): (N,) values at x = 0..N-1.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        (numpy.ndarray): Sorted indices of the kept points.
+    """
+    n = len(values)
+    if threshold >= n:
+        return np.arange(n)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    every = (n - 2) / (threshold - 2)
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, n)  # The last slice looks ahead to the last point
+        next_x = (next_lo + next_hi - 1) / 2
+        next_y = values[next_lo:next_hi].mean()
+        x = np.arange(lo, hi)
+        area = np.abs(
+            (previous - next_x) * (values[lo:hi] - values[previous]) - (previous - x) * (next_y - values[previous])
+        )
+        previous = lo + int(area.argmax())
+        kept[i + 1] = previous
+    return kept
+
+
+def production_series(start_date, end_date, bucket="auto", filters=None, by_camera=False, max_points=500):
+    """
+    Production counts per time bucket, one series per product (or per camera and product), for trend charts.
+
+    Empty buckets count as 0. Series longer than `max_points` buckets are downsampled with LTTB.
+
+    Args:
+        start_date (datetime): Inclusive lower bound on starttime.
+        end_date (datetime): Inclusive upper bound on endtime.
+        bucket (str): "1m", "5m", "1h", "1d", or "auto" for the finest bucket within `max_points`.
+        filters (Q | None): Filters on cameraid and productid.
+        by_camera (bool): One series per camera and product instead of per product.
+        max_points (int): Point budget of each series.
+
+    Returns:
+        dict: {"bucket", "downsampled", "series": [{"cameraid"?, "productid", "productid__name", "points"}]} with
+            points as [bucket start, count] pairs.
+    """
+    start, end = aware(start_date), aware(end_date)
+    if end < start:
+        raise ValueError("endtime must not be before starttime")
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    if bucket == "auto":
+        bucket = choose_bucket(start, end, max_points)
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)} or auto, got {bucket!r}")
+    size = BUCKETS[bucket]
+    first = floor_bucket(start, bucket)
+    length = (floor_bucket(end, bucket) - first) // size + 1
+    if length > MAX_BUCKETS:
+        raise ValueError(f"The range holds {length} {bucket} buckets, use a coarser bucket")
+
+    series = {}
+    for slot, cameraid, productid, name, count in bucket_rows(start, end, bucket, filters or Q()):
+        key = (cameraid, productid) if by_camera else (productid,)
+        if key not in series:
+            series[key] = (name, np.zeros(length, dtype=np.int64))
+        series[key][1][(slot - first) // size] += count
+
+    times = [first + i * size for i in range(length)]
+    result = []
+    downsampled = False
+    for key, (name, values) in sorted(series.items()):
+        kept = np.arange(length)
+        if length > max_points:
+            kept = lttb(values.astype(np.float64), max_points)
+            downsampled = True
+        entry = {"cameraid": key[0]} if by_camera else {}
+        entry.update({
+            "productid": key[-1],
+            "productid__name": name,
+            "points": [[times[i], int(values[i])] for i in kept],
+        })
+        result.append(entry)
+    return {"bucket": bucket, "downsampled": downsampled, "series": result}
@@ -8,6 +8,10 @@ import requests
 import numpy as np
 from datetime import datetime
 from ObjectCount import ObjectCounter
+from FrameQueue import FrameQueue, FrameReader
+from FrameGeometry import analysis_frame_size, counting_band
+from InferenceServer import RemoteDetector
+from SharedFrames import SharedFrames
 
 # Set CUDA to use GTX 1080 Ti (Device 1)
 # torch.cuda.set_device(1)
@@ -22,7 +26,16 @@ class CAMERAMODEL():
             "url": "http://localhost:8000/ai/getcampayload",
             "logdir": "D:/RohitDa/Camduc/paintai/logs",
             "imgdir": "D:/RohitDa/Camduc/paintai/imgs",
-            "rtsp_url": "D:/RohitDa/Camduc/output_part_1.mp4"
+            "rtsp_url": "D:/RohitDa/Camduc/output_part_1.mp4",
+            "queue_size": 1,  # Frames waiting for inference
+            "drop_policy": "latest",  # "latest" keeps the freshest frame, "nth" keeps every keep_every-th frame
+            "keep_every": 1,
+            "analysis_size": None,  # Longer side of the frames ffmpeg emits, e.g. 640 to match the model input
+            "crop_margin": None,  # Pixels kept around region_points when only the counting band is decoded, e.g. 200
+            "inference_server": None,  # (host, port) of InferenceServer.py to share one model, None loads it here
+            "shared_frames": False,  # Decode into shared memory so the inference server reads frames without copies
+            "annotate": False,  # Debug only: draw zones, boxes and counts and show them in a window
+            "zones": None,  # Named counting lines/polygons replacing region_points, e.g. {"left": [(640,0), (640,1440)]}
         }
 
         # Ensure directories exist
@@ -44,14 +57,19 @@ class CAMERAMODEL():
         self.logger.addHandler(time_rotation)
 
         # Initialize ObjectCounter on GPU
+        detector = None
+        if self.camera_config["inference_server"]:
+            detector = RemoteDetector(self.camera_config["camera_id"], self.camera_config["inference_server"])
         self.counter = ObjectCounter(
-            show=False,
+            show=self.camera_config["annotate"],
             region=self.camera_config['region_points'],
             model="D:/RohitDa/Camduc/SudisaItem12K.pt",
             device="cuda:1" if torch.cuda.is_available() else "cpu",  # Force GTX 1080 Ti
             show_in=False,
             show_out=False,
-            verbose=False
+            verbose=False,
+            detector=detector,  # Shared inference server, when configured
+            zones=self.camera_config["zones"],  # Named counting zones, when configured
         )
 
         self.rtsp_url = self.camera_config['rtsp_url']
@@ -68,6 +86,17 @@ class CAMERAMODEL():
             up, down = str(cap_info['r_frame_rate']).split('/')
             self.fps = eval(up) / eval(down)
             self.logger.info(f"fps: {self.fps}, height: {self.height}, width: {self.width}")
+            band_points = self.camera_config["region_points"]
+            if self.camera_config["zones"]:  # The band has to cover every zone
+                band_points = [point for points in self.camera_config["zones"].values() for point in points]
+            self.crop = counting_band(band_points, self.camera_config["crop_margin"], self.width, self.height)
+            self.frame_width, self.frame_height = analysis_frame_size(
+                self.width, self.height, self.camera_config["analysis_size"], self.crop
+            )
+            scale_x, scale_y = self.frame_width / self.crop[2], self.frame_height / self.crop[3]
+            self.counter.set_frame_scale(scale_x, scale_y)
+            self.counter.set_frame_offset(self.crop[0] * scale_x, self.crop[1] * scale_y)
+            self.logger.info(f"analysis band: {self.crop} and frame size: {self.frame_width}x{self.frame_height}")
             
             # Initialize video writer
             # fourcc = cv2.VideoWriter_fourcc(*'mp4v')
@@ -79,37 +108,46 @@ class CAMERAMODEL():
             raise e
 
     def process(self):
+        stream = ffmpeg.input(self.rtsp_url, **self.args)
+        if self.crop != (0, 0, self.width, self.height):
+            stream = stream.filter('crop', self.crop[2], self.crop[3], self.crop[0], self.crop[1])  # Counting band only
+        if (self.frame_width, self.frame_height) != self.crop[2:]:
+            stream = stream.filter('scale', self.frame_width, self.frame_height)  # Scale to the analysis size in ffmpeg
         return (
-            ffmpeg
-            .input(self.rtsp_url, **self.args)
+            stream
             .output('pipe:', format='rawvideo', pix_fmt='bgr24')
             .overwrite_output()
             .run_async(pipe_stdout=True)
         )
 
     def enqueue_frame_buffer(self):
-        self.process1 = self.process()
-        frame_count = 0
+        self.frame_queue = FrameQueue(
+            maxsize=self.camera_config["queue_size"],
+            policy=self.camera_config["drop_policy"],
+            keep_every=self.camera_config["keep_every"],
+        )
+        shared_frames = None
+        if self.camera_config["shared_frames"] and self.counter.detector is not None:
+            shared_frames = SharedFrames(
+                f"camduc_cam{self.camera_config['camera_id']}", self.frame_height, self.frame_width,
+                slots=self.frame_queue.maxsize + 2, create=True
+            )
+            self.counter.detector.use_shared_frames(shared_frames)
+        self.reader = FrameReader(
+            self.process, self.frame_height, self.frame_width, self.frame_queue, self.logger, frames=shared_frames
+        )
+        self.reader.start()  # Drains the ffmpeg pipe independently of inference
+        window_seq = 0  # Stream frame at which the current window started
+        # Production workers count headless; the annotated path is only taken when debugging
+        count_frame = self.counter.count_annotated if self.camera_config["annotate"] else self.counter.count
         starttime = datetime.now().isoformat()
 
         while True:
             try:
-                in_bytes = self.process1.stdout.read(self.width * self.height * 3)
-                if not in_bytes:
-                    self.logger.warning(f"Frame condition issue at {datetime.now()}")
-                    time.sleep(20)
-                    self.process1.terminate()
-                    time.sleep(10)
-                    self.process1 = self.process()
-                    continue
-                
-                Frame = np.frombuffer(in_bytes, np.uint8).reshape([self.height, self.width, 3])
-                
-                # # Make sure the array is writable
-                # Frame = np.frombuffer(in_bytes, np.uint8).reshape([self.height, self.width, 3]).copy()
-
+                Frame, seq, timestamp = self.frame_queue.get()
                 if Frame is not None:
-                    _ = self.counter.count(Frame)
+                    _ = count_frame(Frame)
+                    self.frame_queue.task_done(timestamp)
 
                     # # Draw the region line
                     # line_color = (0, 255, 0)  # Green
@@ -125,27 +163,28 @@ class CAMERAMODEL():
 
                     # # Write frame to output video
                     # self.out.write(Frame)
-                    
-                    frame_count += 1
 
-                    if frame_count % (self.fps * self.update_duration) == 0:
+                    if seq - window_seq >= self.fps * self.update_duration:
                         try:
-                            self.counter.classwise_counts["starttime"] = starttime
-                            self.counter.classwise_counts["endtime"] = datetime.now().isoformat()
-                            self.counter.classwise_counts["cameraid"] = self.camera_config["camera_id"]
-                            self.logger.info(("Classiwise Counts sent - ", self.counter.classwise_counts))
-                            # success = self.send_post_request(self.counter.classwise_counts)
+                            payload = self.counter.counts_payload()
+                            payload["starttime"] = starttime
+                            payload["endtime"] = datetime.now().isoformat()
+                            payload["cameraid"] = self.camera_config["camera_id"]
+                            self.logger.info(("Classiwise Counts sent - ", payload))
+                            # success = self.send_post_request(payload)
                             # if success:
                             #     self.logger.info("Successfully sent to server")
-                            #     self.logger.info(("Classiwise Counts sent - ", self.counter.classwise_counts))
+                            #     self.logger.info(("Classiwise Counts sent - ", payload))
                             # else:
                             #     self.logger.info("Failed to send to server")
-                            #     self.logger.info(("Classiwise Counts sent - ", self.counter.classwise_counts))
+                            #     self.logger.info(("Classiwise Counts sent - ", payload))
                         except Exception as e:
                             self.logger.error("Error Sending to Server")
                             self.logger.error(e)
-                        
-                        frame_count = 0
+
+                        self.logger.info(("Frame queue - ", self.frame_queue.stats()))
+                        self.frame_queue.reset_stats()
+                        window_seq = seq
                         starttime = datetime.now().isoformat()
                         self.counter.reset_count()
 
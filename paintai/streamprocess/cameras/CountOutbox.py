@@ -0,0 +1,101 @@
+import json
+import time
+import sqlite3
+import threading
+
+
+class CountOutbox():
+
+    def __init__(self, path, max_windows=43200):
+        """
+        Append-only local journal of closed count windows, kept in a SQLite database in WAL mode.
+
+        Every window is written here before anything is sent, so windows survive server outages and worker restarts.
+        The reporter reads pending windows in id order, posts them in batches and checkpoints the last id the server
+        acknowledged; acknowledged windows are then removed. When more than `max_windows` windows are pending, the
+        oldest ones are dropped so a dead server cannot fill the disk.
+
+        Args:
+            path (str): Database file, one per camera worker.
+            max_windows (int): Maximum number of pending windows, 43200 is 30 days of 1-minute windows.
+
+        Examples:
+            >>> outbox = CountOutbox("PaintCam1_outbox.sqlite3")
+            >>> outbox.append({"Item1": {"IN": 3, "OUT": 0}, "starttime": ..., "endtime": ..., "cameraid": 2})
+            >>> batch = outbox.pending(500)
+            >>> outbox.ack(batch[-1][0])
+        """
+        self.path = path
+        self.max_windows = max_windows
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")  # A window is on disk once append returns
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS windows (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, "
+            "created REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint (id INTEGER PRIMARY KEY CHECK (id = 0), acked INTEGER NOT NULL)"
+        )
+        self.conn.execute("INSERT OR IGNORE INTO checkpoint (id, acked) VALUES (0, 0)")
+
+    def append(self, window):
+        """
+        Writes a closed window to the journal.
+
+        Returns:
+            (int): Id of the window in the journal.
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(
+                    "INSERT INTO windows (payload, created) VALUES (?, ?)", (json.dumps(window), time.time())
+                )
+                self.conn.execute(
+                    "DELETE FROM windows WHERE id <= ?", (cursor.lastrowid - self.max_windows,)
+                )  # Oldest windows beyond the cap
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            return cursor.lastrowid
+
+    def pending(self, limit):
+        """
+        Returns the oldest windows not acknowledged by the server yet.
+
+        Returns:
+            (List[Tuple[int, dict]]): Up to `limit` (id, window) pairs in journal order.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, payload FROM windows WHERE id > (SELECT acked FROM checkpoint WHERE id = 0) "
+                "ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [(window_id, json.loads(payload)) for window_id, payload in rows]
+
+    def ack(self, window_id):
+        """Checkpoints every window up to `window_id` as stored by the server and removes them from the journal."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute("UPDATE checkpoint SET acked = MAX(acked, ?) WHERE id = 0", (window_id,))
+                self.conn.execute("DELETE FROM windows WHERE id <= ?", (window_id,))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def backlog(self):
+        """Returns the number of windows waiting for the server."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM windows WHERE id > (SELECT acked FROM checkpoint WHERE id = 0)"
+            ).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
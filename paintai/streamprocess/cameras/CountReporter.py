@@ -0,0 +1,124 @@
+import time
+import random
+import threading
+import requests
+
+
+class CountReporter(threading.Thread):
+
+    def __init__(self, url, logger, outbox, max_batch=500, timeout=30, min_backoff=1, max_backoff=60):
+        """
+        Background thread replaying closed count windows from a `CountOutbox` to the server, so the inference loop
+        never waits on the network and no window is lost while the server is down.
+
+        `submit` writes a window to the outbox and returns. The thread keeps one keep-alive `requests.Session`,
+        sends every pending window (up to `max_batch`) as one JSON array, checkpoints the batch in the outbox once the
+        server acknowledged it, and retries failed requests with exponential backoff and full jitter so cameras do
+        not hammer a recovering server in step. After an outage the backlog is drained in large batches instead of
+        one request per window. The server stores nothing of a batch holding an invalid window, so a rejected batch
+        is split in halves until only the rejected windows are dropped. Delivery is at least once: a batch whose answer
+        was lost is sent again, and the server skips the windows it already stored (same camera, starttime, product
+        and zone).
+
+        Args:
+            url (str): getcampayload endpoint of the Django server.
+            logger (logging.Logger): Camera logger.
+            outbox (CountOutbox): Durable journal of the windows to send.
+            max_batch (int): Maximum number of windows sent in one request.
+            timeout (float): Seconds to wait for the server to answer a request.
+            min_backoff (float): Delay cap of the first retry in seconds.
+            max_backoff (float): Maximum delay cap between retries in seconds.
+
+        Examples:
+            >>> outbox = CountOutbox("PaintCam1_outbox.sqlite3")
+            >>> reporter = CountReporter("http://127.0.0.1:8000/ai/getcampayload", logger, outbox)
+            >>> reporter.start()
+            >>> reporter.submit({"Item1": {"IN": 3, "OUT": 0}, "starttime": ..., "endtime": ..., "cameraid": 2})
+        """
+        super().__init__(name="CountReporter", daemon=True)
+        self.url = url
+        self.logger = logger
+        self.outbox = outbox
+        self.max_batch = max(1, int(max_batch))
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.wakeup = threading.Event()
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+
+        self.sent = 0  # Windows acknowledged by the server
+        self.dropped = 0  # Windows the server rejected for good
+
+    def submit(self, window):
+        """Journals a closed window in the outbox and wakes the reporter; never touches the network."""
+        self.outbox.append(window)
+        self.wakeup.set()
+
+    def post(self, batch):
+        """
+        Sends one batch of windows.
+
+        Returns:
+            (bool | None): True when the server stored the windows, False when it rejected them for good (4xx), None
+                when the request should be retried.
+        """
+        try:
+            response = self.session.post(self.url, json=batch, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Error sending POST request: {e}")
+            return None
+        if response.status_code < 400:
+            return True
+        self.logger.error(f"Server answered {response.status_code}: {response.text[:200]}")
+        return False if response.status_code < 500 else None
+
+    def deliver(self, batch):
+        """
+        Sends (window id, window) pairs from the outbox in order and checkpoints them once stored or rejected.
+
+        A batch rejected with a 4xx is bisected and both halves are delivered in turn, so one bad window, e.g. one
+        whose endtime is before its starttime after a clock step, costs about 2 * log2(len(batch)) requests and not
+        the other windows.
+
+        Returns:
+            (bool): True when every window was stored or dropped, False when a request should be retried; windows
+                checkpointed before the failure stay checkpointed.
+        """
+        result = self.post([window for _, window in batch])
+        if result is None:
+            return False
+        if result:
+            self.outbox.ack(batch[-1][0])  # Checkpoint: the batch never has to be sent again
+            self.sent += len(batch)
+            self.logger.info(f"Successfully sent {len(batch)} window(s) to server")
+            return True
+        if len(batch) == 1:
+            self.outbox.ack(batch[0][0])
+            self.dropped += 1
+            self.logger.info(("Classiwise Counts rejected - ", batch[0][1]))
+            return True
+        middle = len(batch) // 2
+        return self.deliver(batch[:middle]) and self.deliver(batch[middle:])
+
+    def run(self):
+        attempt = 0
+        while True:
+            try:
+                batch = self.outbox.pending(self.max_batch)
+                if not batch:
+                    self.wakeup.wait()
+                    self.wakeup.clear()
+                    continue
+
+                if not self.deliver(batch):
+                    attempt += 1
+                    delay = random.uniform(0, min(self.max_backoff, self.min_backoff * 2 ** attempt))
+                    self.logger.info(f"Failed sent to server, retry {attempt} in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                attempt = 0
+            except Exception as e:
+                self.logger.error("Problem with Reporting")
+                self.logger.error(e)
+                time.sleep(self.max_backoff)
@@ -0,0 +1,71 @@
+import numpy as np
+
+from RegionGeometry import RegionGeometry
+
+
+def classwise_counts(names, seen, in_counts, out_counts):
+    """
+    Maps per-class counters indexed by class ID onto the name-keyed dictionary reported to the server.
+
+    Args:
+        names (Dict[int, str]): Class names of the model.
+        seen (numpy.ndarray): (C,) classes detected during the window; only these are reported.
+        in_counts (numpy.ndarray): (C,) objects counted moving inward per class.
+        out_counts (numpy.ndarray): (C,) objects counted moving outward per class.
+
+    Returns:
+        (Dict[str, Dict[str, int]]): {class name: {"IN": n, "OUT": n}}.
+    """
+    return {names[c]: {"IN": int(in_counts[c]), "OUT": int(out_counts[c])} for c in np.flatnonzero(seen)}
+
+
+class CountingZone():
+
+    def __init__(self, name, region, num_classes):
+        """
+        Named counting line or polygon with its own counts, evaluated on the tracks shared by all zones of a camera.
+
+        Counts are kept in arrays indexed by class ID and only mapped to class names when the window is reported.
+
+        Args:
+            name (str): Zone name reported to the server, "" for the single region of a camera without zones.
+            region (List[Tuple[float, float]] | None): Zone points in native stream pixels, None for the default region.
+            num_classes (int): Number of classes of the model.
+
+        Examples:
+            >>> zone = CountingZone("conveyor_left", [(640, 0), (640, 1440)], num_classes=12)
+            >>> zone.compile(scale=(0.25, 0.25))
+        """
+        self.name = name
+        self.native_region = region  # Zone points as configured, in native stream pixels
+        self.geometry = None  # RegionGeometry compiled for the analysed frame size
+        self.in_count = 0  # Counter for objects moving inward
+        self.out_count = 0  # Counter for objects moving outward
+        self.class_in = np.zeros(num_classes, dtype=np.int64)  # Objects moving inward per class ID
+        self.class_out = np.zeros(num_classes, dtype=np.int64)  # Objects moving outward per class ID
+
+    def compile(self, scale):
+        """Compiles the zone points for the analysed frame size, reusing the current geometry when nothing changed."""
+        if self.geometry is None:
+            self.geometry = RegionGeometry(self.native_region, scale)
+        else:
+            self.geometry = self.geometry.with_points(self.native_region).rescaled(scale)
+
+    def add_counts(self, in_counts, out_counts):
+        """
+        Adds the objects counted in one frame.
+
+        Args:
+            in_counts (numpy.ndarray): Objects counted moving inward, indexed by class ID.
+            out_counts (numpy.ndarray): Objects counted moving outward, indexed by class ID.
+        """
+        self.class_in += in_counts
+        self.class_out += out_counts
+        self.in_count += int(in_counts.sum())
+        self.out_count += int(out_counts.sum())
+
+    def reset_count(self):
+        self.in_count = 0
+        self.out_count = 0
+        self.class_in[:] = 0
+        self.class_out[:] = 0
@@ -0,0 +1,70 @@
+import threading
+import numpy as np
+
+
+class FrameRing():
+
+    def __init__(self, height, width, slots=3):
+        """
+        Ring of preallocated frame buffers that are filled in place from a raw bgr24 pipe.
+
+        Every slot is a contiguous (height, width, 3) uint8 array allocated once. `read_from` reads the next frame
+        straight into the next slot with `readinto`, so no bytes object is created per frame and the returned array
+        needs no `np.frombuffer` wrapping. Every frame read pins its slot until `release` is called with it, and the
+        reader skips pinned slots, so a frame stays valid while it is queued or the counter is still working on it
+        however far the reader runs ahead.
+
+        Args:
+            height (int): Frame height in pixels.
+            width (int): Frame width in pixels.
+            slots (int): Number of preallocated frames kept in the ring.
+
+        Examples:
+            >>> ring = FrameRing(1440, 2560)
+            >>> frame = ring.read_from(process.stdout)
+        """
+        self.shape = (height, width, 3)
+        self.frames = [np.empty(self.shape, np.uint8) for _ in range(slots)]
+        self.views = [memoryview(frame).cast("B") for frame in self.frames]  # flat byte views for readinto
+        self.index = 0  # Slot that receives the next frame unless it is pinned
+        self.pinned = set()  # Slots filled and not released yet
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Pins and returns the first free slot from `index` on."""
+        with self.lock:
+            for offset in range(len(self.frames)):
+                slot = (self.index + offset) % len(self.frames)
+                if slot not in self.pinned:
+                    self.pinned.add(slot)
+                    self.index = (slot + 1) % len(self.frames)
+                    return slot
+        raise RuntimeError(f"All {len(self.frames)} frame slots are pinned, release frames once they are processed")
+
+    def release(self, frame):
+        """Unpins the slot of a frame returned by `read_from` so the reader can fill it again."""
+        with self.lock:
+            for slot, slot_frame in enumerate(self.frames):
+                if slot_frame is frame:
+                    self.pinned.discard(slot)
+
+    def read_from(self, stream):
+        """
+        Reads one frame from a binary stream into the next free slot of the ring and pins it.
+
+        Args:
+            stream (io.BufferedReader): Pipe to read from, e.g. the stdout of the ffmpeg process.
+
+        Returns:
+            (numpy.ndarray | None): The filled frame, or None if the stream ended before a full frame was read.
+        """
+        slot = self.acquire()
+        view = self.views[slot]
+        filled = 0
+        while filled < len(view):
+            n = stream.readinto(view[filled:])
+            if not n:
+                self.release(self.frames[slot])
+                return None
+            filled += n
+        return self.frames[slot]
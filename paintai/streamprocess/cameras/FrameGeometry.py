@@ -0,0 +1,60 @@
+def counting_band(region, margin, width, height):
+    """
+    Derives the strip of the frame around the counting region that has to be decoded and analysed.
+
+    The band is the bounding box of the region points grown by `margin` pixels on every side and clipped to the
+    frame. Offsets and sizes are rounded to even values so ffmpeg's crop filter accepts them for any pixel format.
+
+    Args:
+        region (List[Tuple[int, int]]): Region points in native stream pixels.
+        margin (int | None): Pixels kept on each side of the region, or None to keep the whole frame.
+        width (int): Native stream width in pixels.
+        height (int): Native stream height in pixels.
+
+    Returns:
+        (Tuple[int, int, int, int]): Band as x, y, width and height in native stream pixels.
+
+    Examples:
+        >>> counting_band([(1250, 0), (1250, 1440)], 200, 2560, 1440)
+        (1050, 0, 400, 1440)
+    """
+    if margin is None or not region:
+        return 0, 0, width, height
+    x1 = max(0, int(min(p[0] for p in region) - margin)) // 2 * 2
+    y1 = max(0, int(min(p[1] for p in region) - margin)) // 2 * 2
+    x2 = min(width, int(max(p[0] for p in region) + margin + 1))
+    y2 = min(height, int(max(p[1] for p in region) + margin + 1))
+    band_width = max(2, (x2 - x1) // 2 * 2)
+    band_height = max(2, (y2 - y1) // 2 * 2)
+    return x1, y1, band_width, band_height
+
+
+def analysis_frame_size(width, height, analysis_size=None, band=None):
+    """
+    Computes the size of the frames ffmpeg should emit for inference.
+
+    The longer side of the full frame is scaled down to `analysis_size` (typically the model input size, e.g. 640)
+    and the aspect ratio is kept, so region points configured in native pixels map onto the scaled frame with an
+    almost uniform scale. When a counting band is cropped out, the same scale is applied to the band. Sizes are
+    rounded to even values, which every ffmpeg scaler accepts.
+
+    Args:
+        width (int): Native stream width in pixels.
+        height (int): Native stream height in pixels.
+        analysis_size (int | None): Target length of the longer side, or None to keep the native size.
+        band (Tuple[int, int, int, int] | None): Cropped band from `counting_band`, or None for the full frame.
+
+    Returns:
+        (Tuple[int, int]): Width and height of the analysed frames.
+
+    Examples:
+        >>> analysis_frame_size(2560, 1440, 640)
+        (640, 360)
+        >>> analysis_frame_size(2560, 1440, 640, band=(1050, 0, 400, 1440))
+        (100, 360)
+    """
+    band_width, band_height = (band[2], band[3]) if band else (width, height)
+    if not analysis_size or analysis_size >= max(width, height):
+        return band_width, band_height
+    scale = analysis_size / max(width, height)
+    return max(2, round(band_width * scale / 2) * 2), max(2, round(band_height * scale / 2) * 2)
@@ -0,0 +1,165 @@
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from FrameBuffer import FrameRing
+
+
+class FrameQueue():
+
+    def __init__(self, maxsize=1, policy="latest", keep_every=1):
+        """
+        Bounded hand-off between a camera's reader thread and its inference loop.
+
+        The reader never blocks on a slow consumer: when the queue is full the oldest frame is dropped. With the
+        "latest" policy `get` always returns the newest queued frame and drops anything older, so inference works
+        on the freshest picture. With the "nth" policy only every `keep_every`-th frame from the stream is queued
+        and queued frames are consumed in order.
+
+        Frames put with a `release` callback are handed back through it once they are dropped or processed (at
+        `task_done`, or at the next `get` if the consumer skipped it), so the reader can reuse their buffers.
+
+        Args:
+            maxsize (int): Maximum number of frames waiting for inference.
+            policy (str): Drop policy, either "latest" or "nth".
+            keep_every (int): Keep one frame out of every `keep_every` frames when the policy is "nth".
+
+        Examples:
+            >>> queue = FrameQueue(maxsize=1, policy="latest")
+            >>> queue.put(frame, seq=1, timestamp=time.monotonic())
+            >>> frame, seq, timestamp = queue.get()
+        """
+        if policy not in ("latest", "nth"):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.keep_every = max(1, int(keep_every))
+        self.frames = deque()  # (frame, seq, timestamp, release) waiting for inference
+        self.processing = None  # (frame, release) handed out by the last `get`
+        self.condition = threading.Condition()
+
+        self.received = 0  # Frames read from the stream
+        self.dropped = 0  # Frames discarded by the drop policy or because the queue was full
+        self.lag = 0.0  # Seconds between reading the last processed frame and finishing its inference
+        self.max_lag = 0.0  # Worst lag since the last stats reset
+
+    @staticmethod
+    def release(frame, release):
+        if release is not None:
+            release(frame)
+
+    def put(self, frame, seq, timestamp, release=None):
+        """
+        Queues a frame read from the stream, dropping frames according to the policy.
+
+        Args:
+            release (Callable[[numpy.ndarray], None] | None): Called with the frame once it is dropped or processed,
+                e.g. `FrameRing.release`.
+        """
+        with self.condition:
+            self.received += 1
+            if self.policy == "nth" and (seq - 1) % self.keep_every:
+                self.dropped += 1
+                self.release(frame, release)
+                return
+            if len(self.frames) >= self.maxsize:
+                dropped, _, _, dropped_release = self.frames.popleft()
+                self.release(dropped, dropped_release)
+                self.dropped += 1
+            self.frames.append((frame, seq, timestamp, release))
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Waits for the next frame to process.
+
+        Returns:
+            (Tuple[numpy.ndarray, int, float]): Frame, its stream sequence number and the monotonic time it was read,
+                or (None, None, None) if nothing arrived within `timeout`.
+        """
+        with self.condition:
+            if self.processing is not None:  # task_done was skipped, e.g. inference raised
+                self.release(*self.processing)
+                self.processing = None
+            if not self.condition.wait_for(lambda: self.frames, timeout):
+                return None, None, None
+            if self.policy == "latest":
+                while len(self.frames) > 1:
+                    dropped, _, _, dropped_release = self.frames.popleft()
+                    self.release(dropped, dropped_release)
+                    self.dropped += 1
+            frame, seq, timestamp, release = self.frames.popleft()
+            self.processing = (frame, release)
+            return frame, seq, timestamp
+
+    def task_done(self, timestamp):
+        """Records the end-to-end lag of the frame from the last `get` and releases it once inference finished."""
+        with self.condition:
+            self.lag = time.monotonic() - timestamp
+            self.max_lag = max(self.max_lag, self.lag)
+            if self.processing is not None:
+                self.release(*self.processing)
+                self.processing = None
+
+    def stats(self):
+        """Returns queue depth, frame counters and lag so a camera falling behind can be spotted in the logs."""
+        with self.condition:
+            return {
+                "depth": len(self.frames),
+                "received": self.received,
+                "dropped": self.dropped,
+                "lag": round(self.lag, 3),
+                "max_lag": round(self.max_lag, 3),
+            }
+
+    def reset_stats(self):
+        with self.condition:
+            self.received = 0
+            self.dropped = 0
+            self.max_lag = self.lag
+
+
+class FrameReader(threading.Thread):
+
+    def __init__(self, process, height, width, queue, logger, frames=None):
+        """
+        Reader thread that continuously drains the ffmpeg stdout pipe into a `FrameQueue`.
+
+        Frames are read into a `FrameRing` whose slots stay pinned while their frame is queued or being processed
+        and are released by the queue, so a frame is never overwritten under inference. `queue.maxsize` queued
+        frames, one frame in inference and one frame being filled need `queue.maxsize + 2` slots.
+
+        Args:
+            process (Callable[[], subprocess.Popen]): Starts the ffmpeg process, e.g. `CAMERAMODEL.process`.
+            height (int): Frame height in pixels.
+            width (int): Frame width in pixels.
+            queue (FrameQueue): Queue receiving the decoded frames.
+            logger (logging.Logger): Camera logger.
+            frames (SharedFrames | None): Shared-memory slots to decode into instead of a private `FrameRing`, so an
+                inference process can read the frames without copies. Needs at least `queue.maxsize + 2` slots.
+        """
+        super().__init__(name="FrameReader", daemon=True)
+        self.process = process
+        self.queue = queue
+        self.logger = logger
+        self.frames = frames if frames is not None else FrameRing(height, width, slots=queue.maxsize + 2)
+        self.seq = 0  # Frames read from the stream since the reader started
+
+    def run(self):
+        self.process1 = self.process()
+        while True:
+            try:
+                Frame = self.frames.read_from(self.process1.stdout)
+                if Frame is None:
+                    self.logger.info("Some Issue with reading from STDOUT")
+                    self.logger.warning(f"Frame condition - {datetime.now()}")
+                    time.sleep(20)
+                    self.process1.terminate()
+                    time.sleep(10)
+                    self.process1 = self.process()
+                    continue
+                self.seq += 1
+                self.queue.put(Frame, self.seq, time.monotonic(), release=self.frames.release)
+            except Exception as e:
+                self.logger.error("Problem with Reading")
+                self.logger.error(e)
@@ -0,0 +1,216 @@
+import os
+import time
+import queue
+import logging
+import logging.handlers
+import threading
+from multiprocessing.connection import Client, Listener
+from SharedFrames import SharedFrames
+
+DEFAULT_ADDRESS = ("127.0.0.1", 6000)
+DEFAULT_AUTHKEY = b"camduc"
+
+
+class InferenceServer():
+
+    def __init__(self, model, address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY, max_batch_size=8, max_wait_ms=10,
+                 logger=None, **predict_args):
+        """
+        Single process holding one copy of the detection model for every camera worker on the machine.
+
+        Camera workers connect with `RemoteDetector` and send one frame at a time, either pickled or, with shared
+        frames enabled, as the name and sequence number of a `SharedFrames` slot. Frames from all cameras are
+        collected into dynamic batches: a batch is run as soon as `max_batch_size` frames are waiting or the oldest
+        frame has waited `max_wait_ms`. Only detections are returned; tracking stays in each camera worker so every
+        `ObjectCounter` keeps its own tracker and `track_history`.
+
+        Args:
+            model (str): Path to the YOLO weights, e.g. "SudisaItem12K.pt".
+            address (Tuple[str, int]): Host and port to listen on.
+            authkey (bytes): Shared secret camera workers must present.
+            max_batch_size (int): Maximum number of frames run in one forward pass.
+            max_wait_ms (float): Maximum time the first frame of a batch waits for more frames.
+            logger (logging.Logger | None): Logger for connection and batch errors.
+            **predict_args (Any): Extra arguments for `YOLO.predict`, e.g. conf, iou, device or half.
+
+        Examples:
+            >>> server = InferenceServer("SudisaItem12K.pt", max_batch_size=8, max_wait_ms=10, conf=0.5)
+            >>> server.serve_forever()
+        """
+        from ultralytics import YOLO
+
+        self.model = YOLO(model)
+        self.address = tuple(address)
+        self.authkey = authkey
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max_wait_ms / 1000
+        self.logger = logger or logging.getLogger(__name__)
+        self.predict_args = {"verbose": False, **predict_args}
+        self.requests = queue.Queue()  # (camera_id, frame, reply queue) waiting for the next batch
+
+    def serve_forever(self):
+        """Accepts camera workers and runs the batching loop until the process is stopped."""
+        threading.Thread(target=self.batch_loop, name="BatchLoop", daemon=True).start()
+        with Listener(self.address, backlog=32, authkey=self.authkey) as listener:
+            self.logger.info(f"Inference server listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    self.logger.error("Rejected connection")
+                    self.logger.error(e)
+                    continue
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        """Serves one camera worker: receives frames and sends back their detections."""
+        reply = queue.Queue(maxsize=1)
+        shared = {}  # SharedFrames segments this worker publishes frames in, by name
+        try:
+            conn.send({"names": self.model.names})
+            while True:
+                camera_id, frame = conn.recv()
+                if not isinstance(frame, tuple):
+                    self.requests.put((camera_id, frame, reply))
+                    conn.send(reply.get())
+                    continue
+
+                name, seq = frame  # Frame published in shared memory, mapped without a copy
+                if name not in shared:
+                    shared[name] = SharedFrames(name)
+                view = shared[name].get(seq)
+                if view is None:
+                    conn.send(LookupError(f"Frame {seq} of {name} was overwritten before inference"))
+                    continue
+                self.requests.put((camera_id, view, reply))
+                result = reply.get()
+                if not shared[name].is_current(seq):
+                    result = LookupError(f"Frame {seq} of {name} was overwritten during inference")
+                conn.send(result)
+        except (EOFError, OSError):
+            pass  # Camera worker disconnected
+        finally:
+            conn.close()
+            for frames in shared.values():
+                frames.close()
+
+    def next_batch(self):
+        """Blocks for the first request, then collects more until the batch is full or max_wait_ms has passed."""
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def batch_loop(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                results = self.model.predict([frame for _, frame, _ in batch], **self.predict_args)
+                for (_, _, reply), result in zip(batch, results):
+                    reply.put(result.boxes.data.cpu().numpy())  # x1, y1, x2, y2, conf, cls per detection
+            except Exception as e:
+                self.logger.error(f"Problem with batch of cameras {[camera_id for camera_id, _, _ in batch]}")
+                self.logger.error(e)
+                for _, _, reply in batch:
+                    reply.put(e)
+
+
+class RemoteDetector():
+
+    def __init__(self, camera_id, address=DEFAULT_ADDRESS, authkey=DEFAULT_AUTHKEY):
+        """
+        Camera-side client of `InferenceServer`, passed to `ObjectCounter` instead of loading a local model.
+
+        Args:
+            camera_id (int): Camera the frames belong to, used in server-side error logs.
+            address (Tuple[str, int]): Host and port of the inference server.
+            authkey (bytes): Shared secret of the inference server.
+
+        Examples:
+            >>> detector = RemoteDetector(2)
+            >>> counter = ObjectCounter(region=[(1250, 0), (1250, 1440)], detector=detector)
+        """
+        self.camera_id = camera_id
+        self.address = tuple(address)
+        self.authkey = authkey
+        self.shared_frames = None  # SharedFrames to hand frames over in, see `use_shared_frames`
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        self.conn = Client(self.address, authkey=self.authkey)
+        self.names = self.conn.recv()["names"]
+
+    def use_shared_frames(self, shared_frames):
+        """
+        Hands frames to the server through shared memory instead of pickling them over the connection.
+
+        Frames the camera's `FrameReader` decoded straight into `shared_frames` are sent by sequence number only;
+        their slot stays pinned until the frame queue releases it, so it is not rewritten during inference. Any
+        other frame is pickled over the connection: the reader thread is the only writer of the segment.
+
+        Args:
+            shared_frames (SharedFrames): Segment created by this camera worker.
+        """
+        self.shared_frames = shared_frames
+
+    def detect(self, frame):
+        """
+        Runs the shared model on one frame.
+
+        Returns:
+            (numpy.ndarray): Detections as rows of x1, y1, x2, y2, conf, cls.
+        """
+        if self.conn is None:
+            self.connect()  # Server restarted since the last frame
+        if self.shared_frames is not None:
+            seq = self.shared_frames.seq_of(frame)
+            if seq is not None:
+                frame = (self.shared_frames.name, seq)
+        try:
+            self.conn.send((self.camera_id, frame))
+            result = self.conn.recv()
+        except (EOFError, OSError):
+            self.conn = None
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+if __name__ == "__main__":
+
+    config = {
+        "model": "D:/RohitDa/Camduc/paintai/streamprocess/cameras/SudisaItem12K.pt",
+        "address": DEFAULT_ADDRESS,
+        "max_batch_size": 8,
+        "max_wait_ms": 10,
+        "logdir": "D:/RohitDa/Camduc/paintai/logs",
+    }
+
+    os.makedirs(config["logdir"], exist_ok=True)
+    logger = logging.getLogger("InferenceServer")
+    logger.setLevel(logging.DEBUG)
+    time_rotation = logging.handlers.TimedRotatingFileHandler(
+        filename=os.path.join(config["logdir"], "InferenceServer.log"), when='W5', backupCount=1
+    )
+    time_rotation.setFormatter(logging.Formatter(
+        '%(asctime)s - %(name)s - %(threadName)s - %(funcName)s - %(levelname)s - %(message)s'
+    ))
+    logger.addHandler(time_rotation)
+
+    server = InferenceServer(
+        config["model"],
+        address=config["address"],
+        max_batch_size=config["max_batch_size"],
+        max_wait_ms=config["max_wait_ms"],
+        logger=logger,
+    )
+    server.serve_forever()
@@ -0,0 +1,121 @@
+import numpy as np
+import shapely
+
+
+def cross(origin, a, b):
+    """Z component of (a - origin) x (b - origin), broadcast over rows."""
+    return (a[..., 0] - origin[..., 0]) * (b[..., 1] - origin[..., 1]) - (a[..., 1] - origin[..., 1]) * (
+        b[..., 0] - origin[..., 0]
+    )
+
+
+def line_coefficients(start, end):
+    """
+    Half-plane coefficients of the line through `start` and `end`.
+
+    Returns:
+        (Tuple[float, float, float]): (a, b, c) such that a * x + b * y + c is the cross product
+            (end - start) x (point - start), i.e. positive on one side of the line, negative on the other, 0 on it.
+    """
+    (x1, y1), (x2, y2) = start, end
+    return float(y1 - y2), float(x2 - x1), float(x1 * y2 - x2 * y1)
+
+
+def segments_intersect(start, end, prev, curr, coefficients=None):
+    """
+    Tests the trajectories of all tracks against the counting line in one pass.
+
+    Gives the same answer as `LineString([start, end]).intersects(LineString([prev, curr]))` per row: segments that
+    only touch at an end point intersect and collinear segments intersect when they overlap. A track that did not
+    move never intersects, even on the line, because shapely treats its zero-length LineString as empty. Pixel
+    coordinates keep the cross products exact in float64.
+
+    Args:
+        start (Tuple[float, float]): First point of the counting line.
+        end (Tuple[float, float]): Second point of the counting line.
+        prev (numpy.ndarray): (N, 2) previous positions of the tracks.
+        curr (numpy.ndarray): (N, 2) current centroids of the tracks.
+        coefficients (Tuple[float, float, float] | None): Precomputed `line_coefficients(start, end)`.
+
+    Returns:
+        (numpy.ndarray): (N,) boolean mask of the trajectories that intersect the line.
+
+    Examples:
+        >>> segments_intersect((1250, 0), (1250, 1440), np.array([[1240.0, 700.0]]), np.array([[1260.0, 705.0]]))
+        array([ True])
+    """
+    a = np.asarray(start, dtype=np.float64)
+    b = np.asarray(end, dtype=np.float64)
+    p = np.asarray(prev, dtype=np.float64)
+    q = np.asarray(curr, dtype=np.float64)
+
+    la, lb, lc = line_coefficients(start, end) if coefficients is None else coefficients
+    o1 = la * p[:, 0] + lb * p[:, 1] + lc  # Side of the line each end of the trajectory is on
+    o2 = la * q[:, 0] + lb * q[:, 1] + lc
+    o3 = cross(p, q, a)  # Side of the trajectory each end of the line is on
+    o4 = cross(p, q, b)
+    straddles = (o1 * o2 <= 0) & (o3 * o4 <= 0)
+
+    # Collinear segments pass the sign test above and only intersect when their extents overlap
+    collinear = (o1 == 0) & (o2 == 0)
+    low = np.maximum(np.minimum(a, b), np.minimum(p, q))
+    high = np.minimum(np.maximum(a, b), np.maximum(p, q))
+    overlap = np.all(low <= high, axis=1)
+    moved = np.any(p != q, axis=1)
+    return straddles & (~collinear | overlap) & moved
+
+
+def moving_inward(prev, curr, vertical):
+    """
+    Applies the counting direction rule: vertical regions count movement to the right as IN, horizontal regions
+    count movement downward as IN.
+
+    Returns:
+        (numpy.ndarray): (N,) boolean mask, True for IN and False for OUT.
+    """
+    axis = 0 if vertical else 1
+    return curr[:, axis] > prev[:, axis]
+
+
+def line_crossings(start, end, prev, curr, vertical, coefficients=None):
+    """
+    Finds the tracks whose last step crossed a counting line and the direction they crossed it in.
+
+    Args:
+        start (Tuple[float, float]): First point of the counting line.
+        end (Tuple[float, float]): Second point of the counting line.
+        prev (numpy.ndarray): (N, 2) previous positions of the tracks.
+        curr (numpy.ndarray): (N, 2) current centroids of the tracks.
+        vertical (bool): Whether the line is vertical, i.e. counts left/right movement.
+        coefficients (Tuple[float, float, float] | None): Precomputed `line_coefficients(start, end)`.
+
+    Returns:
+        (Tuple[numpy.ndarray, numpy.ndarray]): (N,) masks of crossing tracks and of tracks moving inward.
+    """
+    return segments_intersect(start, end, prev, curr, coefficients), moving_inward(prev, curr, vertical)
+
+
+def polygon_entries(polygon, prev, curr, vertical, bounds=None):
+    """
+    Finds the tracks whose current centroid lies strictly inside a counting polygon and their direction.
+
+    Args:
+        polygon (shapely.geometry.Polygon): Counting region.
+        prev (numpy.ndarray): (N, 2) previous positions of the tracks.
+        curr (numpy.ndarray): (N, 2) current centroids of the tracks.
+        vertical (bool): Whether the polygon is taller than wide, i.e. counts left/right movement.
+        bounds (Tuple[float, float, float, float] | None): Polygon bounds (minx, miny, maxx, maxy). Centroids outside
+            them are rejected with plain comparisons and only the rest are passed to shapely.
+
+    Returns:
+        (Tuple[numpy.ndarray, numpy.ndarray]): (N,) masks of tracks inside the polygon and of tracks moving inward.
+    """
+    x, y = curr[:, 0], curr[:, 1]
+    if bounds is None:
+        return shapely.contains_xy(polygon, x, y), moving_inward(prev, curr, vertical)
+
+    minx, miny, maxx, maxy = bounds
+    inside = (x > minx) & (x < maxx) & (y > miny) & (y < maxy)  # Interior points lie strictly inside the bounds
+    if inside.any():
+        inside[inside] = shapely.contains_xy(polygon, x[inside], y[inside])
+    return inside, moving_inward(prev, curr, vertical)
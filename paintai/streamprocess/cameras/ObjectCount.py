@@ -1,111 +1,249 @@
 # Ultralytics YOLO 🚀, AGPL-3.0 license
 
+import numpy as np
+
+from ultralytics.engine.results import Boxes
 from ultralytics.solutions.solutions import BaseSolution
 from ultralytics.utils.plotting import Annotator, colors
 
+from CountingZone import CountingZone, classwise_counts
+from TrackStore import TrackStore
+
 
 class ObjectCounter(BaseSolution):
 
     def __init__(self, **kwargs):
         """Initializes the ObjectCounter class for real-time object counting in video streams."""
-        super().__init__(**kwargs)
+        self.detector = kwargs.pop("detector", None)  # Shared model behind InferenceServer, None for a local model
+        max_track_age = kwargs.pop("max_track_age", 150)  # Frames an unseen track is kept before it is evicted
+        max_tracks = kwargs.pop("max_tracks", 1024)  # Hard cap on the tracks held per camera
+        zones = kwargs.pop("zones", None)  # Named lines or polygons counted from the same tracks, {name: points}
+        if self.detector is None:
+            super().__init__(**kwargs)
+        else:
+            self.initialize_remote(**kwargs)
 
         self.in_count = 0  # Counter for objects moving inward
         self.out_count = 0  # Counter for objects moving outward
-        self.counted_ids = []  # List of IDs of objects that have been counted
-        self.classwise_counts = {}  # Dictionary for counts, categorized by object class
+        self.track_store = TrackStore(history=30, max_age=max_track_age, max_tracks=max_tracks)  # Bounded track state
+        num_classes = len(self.names)
+        self.class_seen = np.zeros(num_classes, dtype=bool)  # Classes detected in the current window, by class ID
+        self.class_in = np.zeros(num_classes, dtype=np.int64)  # Objects moving inward per class ID, over all zones
+        self.class_out = np.zeros(num_classes, dtype=np.int64)  # Objects moving outward per class ID, over all zones
         self.region_initialized = False  # Bool variable for region initialization
-        
+        self.named_zones = zones is not None  # Report counts per zone instead of for the single region
+        # Counting zones in native stream pixels; without named zones the configured region is the only zone
+        self.zones = {
+            name: CountingZone(name, points, num_classes) for name, points in (zones or {"": self.region}).items()
+        }
+        self.counted_ids = self.track_store.counted_in(next(iter(self.zones)))  # Set of IDs of counted objects
+        self.frame_scale = (1.0, 1.0)  # Scale from native stream pixels to the analysed frames
+        self.frame_offset = (0.0, 0.0)  # Position of a cropped analysed frame inside the full scaled frame
+
         self.show_in = self.CFG["show_in"]
         self.show_out = self.CFG["show_out"]
 
+    def initialize_remote(self, **kwargs):
+        """
+        Mirrors BaseSolution.__init__ for a counter whose detections come from a shared inference server.
+
+        No model is loaded in the camera worker. Class names are taken from the server and a tracker of the
+        configured type is kept locally, so tracking state and the track store stay separate per camera.
+        """
+        from shapely.geometry import LineString, Point, Polygon
+        from shapely.prepared import prep
+        from ultralytics.trackers.track import TRACKER_MAP
+        from ultralytics.utils import DEFAULT_CFG_DICT, DEFAULT_SOL_DICT, IterableSimpleNamespace, yaml_load
+        from ultralytics.utils.checks import check_yaml
+
+        self.LineString = LineString
+        self.Polygon = Polygon
+        self.Point = Point
+        self.prep = prep
+
+        self.CFG = {**DEFAULT_SOL_DICT, **DEFAULT_CFG_DICT, **kwargs}
+        self.region = self.CFG["region"]
+        self.line_width = self.CFG["line_width"] if self.CFG["line_width"] is not None else 2
+        self.model = None
+        self.names = self.detector.names
+        self.env_check = False
+
+        tracker_cfg = IterableSimpleNamespace(**yaml_load(check_yaml(self.CFG["tracker"])))
+        self.tracker = TRACKER_MAP[tracker_cfg.tracker_type](args=tracker_cfg, frame_rate=30)
+
+    def extract_tracks(self, im0):
+        """
+        Extracts tracks from an input frame, using the shared inference server when a detector is configured.
+
+        Unlike BaseSolution, boxes, track IDs and classes are kept as contiguous NumPy arrays, (N, 4) float, (N,)
+        int and (N,) int, so counting works on them without per-box Python lists.
+
+        Args:
+            im0 (numpy.ndarray): The input image or frame.
+        """
+        if self.detector is None:
+            self.tracks = self.model.track(source=im0, persist=True, classes=self.CFG["classes"], **self.track_add_args)
+            self.track_data = self.tracks[0].obb or self.tracks[0].boxes  # Extract tracks for OBB or object detection
+            if self.track_data and self.track_data.id is not None:
+                self.boxes = self.track_data.xyxy.cpu().numpy()
+                self.track_ids = self.track_data.id.int().cpu().numpy()
+                self.clss = self.track_data.cls.int().cpu().numpy()
+                return
+        else:
+            detections = Boxes(self.detector.detect(im0), im0.shape[:2])
+            tracks = self.tracker.update(detections, im0) if len(detections) else []
+            if len(tracks):
+                self.boxes = tracks[:, :4]  # x1, y1, x2, y2
+                self.track_ids = tracks[:, 4].astype(int)
+                self.clss = tracks[:, 6].astype(int)
+                return
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.track_ids = np.empty(0, dtype=int)
+        self.clss = np.empty(0, dtype=int)
+
     def reset_count(self):
         self.in_count = 0  # Counter for objects moving inward
         self.out_count = 0  # Counter for objects moving outward
-        self.counted_ids = []  # List of IDs of objects that have been counted
-        self.classwise_counts = {}  # Dictionary for counts, categorized by object class
+        self.track_store.reset_counted()  # Set of IDs of objects that have been counted
+        self.class_seen[:] = False
+        self.class_in[:] = 0
+        self.class_out[:] = 0
+        for zone in self.zones.values():
+            zone.reset_count()
     
-    def count_objects(self, current_centroid, track_id, prev_position, cls):
+    def set_frame_scale(self, scale_x, scale_y):
+        """
+        Sets the scale of the analysed frames relative to the native stream so region points stay in native pixels.
+
+        Args:
+            scale_x (float): Analysed frame width divided by the native stream width.
+            scale_y (float): Analysed frame height divided by the native stream height.
+
+        Examples:
+            >>> counter = ObjectCounter(region=[(1250, 0), (1250, 1440)])
+            >>> counter.set_frame_scale(640 / 2560, 360 / 1440)  # ffmpeg emits 640x360 frames
+        """
+        self.frame_scale = (scale_x, scale_y)
+        self.region_initialized = False  # Re-map the region on the next frame
+
+    def set_frame_offset(self, offset_x, offset_y):
+        """
+        Sets where a cropped analysed frame sits inside the full frame so boxes can be translated back before counting.
+
+        Args:
+            offset_x (float): Left edge of the crop in analysed (scaled) pixels.
+            offset_y (float): Top edge of the crop in analysed (scaled) pixels.
+
+        Examples:
+            >>> counter = ObjectCounter(region=[(1250, 0), (1250, 1440)])
+            >>> counter.set_frame_offset(1050, 0)  # ffmpeg crops the band starting at x=1050
+        """
+        self.frame_offset = (offset_x, offset_y)
+
+    def set_region(self, region, zone=""):
+        """
+        Changes a counting region at runtime; it is recompiled before the next frame is counted.
+
+        Args:
+            region (List[Tuple[float, float]]): New region points in native stream pixels.
+            zone (str): Name of the zone to change, "" for the single region of a counter without named zones.
+
+        Examples:
+            >>> counter = ObjectCounter(region=[(1250, 0), (1250, 1440)])
+            >>> counter.set_region([(1300, 0), (1300, 1440)])
         """
-        Counts objects within a polygonal or linear region based on their tracks.
+        self.zones[zone].native_region = region
+        self.region_initialized = False
+
+    def initialize_region(self):
+        """Initializes the counting zones, compiling their native points for the analysed frame size."""
+        for zone in self.zones.values():
+            if zone.native_region is None:
+                super().initialize_region()  # Fall back to the default region
+                zone.native_region = self.region
+            zone.compile(self.frame_scale)
+        geometry = next(iter(self.zones.values())).geometry
+        self.region = list(geometry.points)
+        self.r_s = geometry.shape
+
+    def count_objects(self, current_centroids, track_ids, prev_positions, clss):
+        """
+        Counts objects within polygonal or linear zones based on their tracks, for all tracks of a frame at once.
+
+        Trajectories are tested against each compiled zone with vectorized segment intersection (or a vectorized
+        containment test for polygons) instead of building shapely geometries per object. Results are identical to
+        the per-object shapely checks, including the vertical/horizontal direction rules. Every zone keeps its own
+        counted IDs, so an object crossing two zones is counted once in each.
 
         Args:
-            current_centroid (Tuple[float, float]): Current centroid values in the current frame.
-            track_id (int): Unique identifier for the tracked object.
-            prev_position (Tuple[float, float]): Last frame position coordinates (x, y) of the track.
-            cls (int): Class index for classwise count updates.
+            current_centroids (numpy.ndarray): (N, 2) centroids of the tracks in the current frame.
+            track_ids (numpy.ndarray): (N,) unique identifiers of the tracked objects.
+            prev_positions (numpy.ndarray): (N, 2) last frame positions of the tracks, NaN for new tracks.
+            clss (numpy.ndarray): (N,) class IDs for classwise count updates.
 
         Examples:
             >>> counter = ObjectCounter()
-            >>> track_line = {1: [100, 200], 2: [110, 210], 3: [120, 220]}
-            >>> box = [130, 230, 150, 250]
-            >>> track_id = 1
-            >>> prev_position = (120, 220)
-            >>> cls = 0
-            >>> counter.count_objects(current_centroid, track_id, prev_position, cls)
-        """
-        if prev_position is None or track_id in self.counted_ids:
-            return
-
-        if len(self.region) == 2:  # Linear region (defined as a line segment)
-            line = self.LineString(self.region)  # Check if the line intersects the trajectory of the object
-            if line.intersects(self.LineString([prev_position, current_centroid])):
-                # Determine orientation of the region (vertical or horizontal)
-                if abs(self.region[0][0] - self.region[1][0]) < abs(self.region[0][1] - self.region[1][1]):
-                    # Vertical region: Compare x-coordinates to determine direction
-                    if current_centroid[0] > prev_position[0]:  # Moving right
-                        self.in_count += 1
-                        self.classwise_counts[self.names[cls]]["IN"] += 1
-                    else:  # Moving left
-                        self.out_count += 1
-                        self.classwise_counts[self.names[cls]]["OUT"] += 1
-                # Horizontal region: Compare y-coordinates to determine direction
-                elif current_centroid[1] > prev_position[1]:  # Moving downward
-                    self.in_count += 1
-                    self.classwise_counts[self.names[cls]]["IN"] += 1
-                else:  # Moving upward
-                    self.out_count += 1
-                    self.classwise_counts[self.names[cls]]["OUT"] += 1
-                self.counted_ids.append(track_id)
-
-        elif len(self.region) > 2:  # Polygonal region
-            polygon = self.Polygon(self.region)
-            if polygon.contains(self.Point(current_centroid)):
-                # Determine motion direction for vertical or horizontal polygons
-                region_width = max(p[0] for p in self.region) - min(p[0] for p in self.region)
-                region_height = max(p[1] for p in self.region) - min(p[1] for p in self.region)
-
-                if (
-                    region_width < region_height
-                    and current_centroid[0] > prev_position[0]
-                    or region_width >= region_height
-                    and current_centroid[1] > prev_position[1]
-                ):  # Moving right
-                    self.in_count += 1
-                    self.classwise_counts[self.names[cls]]["IN"] += 1
-                else:  # Moving left
-                    self.out_count += 1
-                    self.classwise_counts[self.names[cls]]["OUT"] += 1
-                self.counted_ids.append(track_id)
+            >>> current_centroids = np.array([[130.0, 230.0]])
+            >>> prev_positions = np.array([[120.0, 220.0]])
+            >>> counter.count_objects(current_centroids, np.array([1]), prev_positions, np.array([0]))
+        """
+        moved = ~np.isnan(prev_positions[:, 0])
+        for zone in self.zones.values():
+            candidates = moved & ~self.track_store.is_counted(track_ids, zone.name)
+            if not candidates.any():
+                continue
+
+            counted, inward = zone.geometry.crossings(prev_positions[candidates], current_centroids[candidates])
+            cls = clss[candidates]
+            in_counts = np.bincount(cls[counted & inward], minlength=len(self.names))
+            out_counts = np.bincount(cls[counted & ~inward], minlength=len(self.names))
+            zone.add_counts(in_counts, out_counts)
+            self.class_in += in_counts
+            self.class_out += out_counts
+            self.in_count += int(in_counts.sum())
+            self.out_count += int(out_counts.sum())
+            self.track_store.mark_counted(track_ids[candidates][counted].tolist(), zone.name)
 
     def store_classwise_counts(self, cls):
         """
-        Initialize class-wise counts for a specific object class if not already present.
+        Marks object classes as detected in the current window so they are reported, with zero counts if needed.
 
         Args:
-            cls (int): Class index for classwise count updates.
-
-        This method ensures that the 'classwise_counts' dictionary contains an entry for the specified class,
-        initializing 'IN' and 'OUT' counts to zero if the class is not already present.
+            cls (int | numpy.ndarray): Class ID, or array of class IDs for classwise count updates.
 
         Examples:
             >>> counter = ObjectCounter()
-            >>> counter.store_classwise_counts(0)  # Initialize counts for class index 0
+            >>> counter.store_classwise_counts(0)  # Report class index 0
             >>> print(counter.classwise_counts)
             {'person': {'IN': 0, 'OUT': 0}}
         """
-        if self.names[cls] not in self.classwise_counts:
-            self.classwise_counts[self.names[cls]] = {"IN": 0, "OUT": 0}
+        self.class_seen[cls] = True
+
+    @property
+    def classwise_counts(self):
+        """Counts of the current window summed over all zones, {class name: {"IN": n, "OUT": n}}."""
+        return classwise_counts(self.names, self.class_seen, self.class_in, self.class_out)
+
+    def counts_payload(self):
+        """
+        Returns the counts of the current window in the shape `getCameraPayload` expects.
+
+        Class IDs are mapped to names here, once per window. Without named zones this is the classwise counts
+        dictionary, {product: {"IN": n, "OUT": n}}. With named zones the counts of every zone are reported under
+        "zones", {"zones": {zone: {product: {"IN": n, "OUT": n}}}}.
+
+        Examples:
+            >>> counter = ObjectCounter(zones={"left": [(640, 0), (640, 1440)], "right": [(1920, 0), (1920, 1440)]})
+            >>> payload = counter.counts_payload()
+        """
+        if not self.named_zones:
+            return self.classwise_counts
+        return {
+            "zones": {
+                zone.name: classwise_counts(self.names, self.class_seen, zone.class_in, zone.class_out)
+                for zone in self.zones.values()
+            }
+        }
 
     def display_counts(self, im0):
         """
@@ -133,14 +271,15 @@ class ObjectCounter(BaseSolution):
         """
         Processes input data (frames or object tracks) and updates object counts.
 
-        This method initializes the counting region, extracts tracks, draws bounding boxes and regions, updates
-        object counts, and displays the results on the input image.
+        This is the headless path used by production workers: it initializes the counting zones, extracts tracks
+        and updates object counts without building an Annotator or touching the image pixels. Use
+        `count_annotated` to draw the results.
 
         Args:
             im0 (numpy.ndarray): The input image or frame to be processed.
 
         Returns:
-            (numpy.ndarray): The processed image with annotations and count information.
+            (numpy.ndarray): The input image, unchanged.
 
         Examples:
             >>> counter = ObjectCounter()
@@ -151,19 +290,68 @@ class ObjectCounter(BaseSolution):
             self.initialize_region()
             self.region_initialized = True
 
-        self.annotator = Annotator(im0, line_width=self.line_width)  # Initialize annotator
         self.extract_tracks(im0)  # Extract tracks
+        if len(self.boxes) and self.frame_offset != (0.0, 0.0):  # Translate boxes of a cropped band to the full frame
+            self.boxes[:, 0::2] += self.frame_offset[0]
+            self.boxes[:, 1::2] += self.frame_offset[1]
+
+        if not len(self.track_ids):
+            return im0
+
+        boxes = np.asarray(self.boxes)
+        track_ids = np.asarray(self.track_ids, dtype=int)
+        clss = np.asarray(self.clss).astype(int)
+        current_centroids = (boxes[:, :2] + boxes[:, 2:4]) / 2  # All centroids at once, in the precision of the boxes
+        # Store track history and get the previous position of every track for object counting
+        prev_positions = self.track_store.update(track_ids, current_centroids)
+        self.store_classwise_counts(clss)  # Report every detected class
+
+        self.count_objects(current_centroids.astype(np.float64), track_ids, prev_positions, clss)
+
+        return im0  # return output image for more usage
+
+    def count_annotated(self, im0):
+        """
+        Debug path of `count`: counts the frame the same way, then draws zones, boxes, track trails and counts.
+
+        Drawing happens on a copy of the frame because the frame itself may still be read from the frame ring or
+        a shared-memory slot. Boxes and zones are kept in full-frame pixels, so they are shifted back onto a cropped
+        counting band before drawing.
+
+        Args:
+            im0 (numpy.ndarray): The input image or frame to be processed.
+
+        Returns:
+            (numpy.ndarray): Annotated copy of the frame.
+
+        Examples:
+            >>> counter = ObjectCounter(show=True)
+            >>> frame = cv2.imread("path/to/image.jpg")
+            >>> annotated_frame = counter.count_annotated(frame)
+        """
+        self.count(im0)
+        im0 = im0.copy()
+        self.annotator = Annotator(im0, line_width=self.line_width)  # Initialize annotator
+        offset_x, offset_y = self.frame_offset
+
+        for zone in self.zones.values():  # Draw regions
+            self.annotator.draw_region(
+                reg_pts=[(int(x - offset_x), int(y - offset_y)) for x, y in zone.geometry.points],
+                color=(104, 0, 123),
+                thickness=self.line_width * 2,
+            )
 
-        # Iterate over bounding boxes, track ids and classes index
-        for box, track_id, cls in zip(self.boxes, self.track_ids, self.clss):
-            self.store_tracking_history(track_id, box)  # Store track history
-            self.store_classwise_counts(cls)  # store classwise counts in dict
+        offset = np.array([offset_x, offset_y, offset_x, offset_y])
+        for box, track_id, cls in zip(np.asarray(self.boxes).reshape(-1, 4), self.track_ids, self.clss):
+            # Draw bounding box and tracks of objects
+            self.annotator.box_label(box - offset, label=self.names[cls], color=colors(cls, True))
+            self.annotator.draw_centroid_and_tracks(
+                self.track_store.track_line(track_id) - offset[:2],
+                color=colors(int(cls), True),
+                track_thickness=self.line_width,
+            )
 
-            current_centroid = ((box[0] + box[2]) / 2, (box[1] + box[3]) / 2)
-            # store previous position of track for object counting
-            prev_position = None
-            if len(self.track_history[track_id]) > 1:
-                prev_position = self.track_history[track_id][-2]
-            self.count_objects(current_centroid, track_id, prev_position, cls)  # Perform object counting
+        self.display_counts(im0)  # Display the counts on the frame
+        self.display_output(im0)  # display output with base class function
 
-        return im0  # return output image for more usage
\ No newline at end of file
+        return im0
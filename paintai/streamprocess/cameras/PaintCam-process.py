@@ -109,20 +109,21 @@ class VideoProcessor:
                     break
                 _ = self.counter.count(frame)
 
-            self.counter.classwise_counts["starttime"] = starttime
-            self.counter.classwise_counts["endtime"] = datetime.now().isoformat()
-            self.counter.classwise_counts["cameraid"] = self.config["camera_id"]
+            payload = self.counter.counts_payload()
+            payload["starttime"] = starttime
+            payload["endtime"] = datetime.now().isoformat()
+            payload["cameraid"] = self.config["camera_id"]
 
-            success = self.send_post_request(self.counter.classwise_counts)
+            success = self.send_post_request(payload)
             if success:
                 self.logger.info(f"Successfully sent data for video: {video_path}")
-                self.logger.info(f"Classwise Counts: {self.counter.classwise_counts}")
+                self.logger.info(f"Classwise Counts: {payload}")
             else:
                 self.logger.warning(f"Failed to send data for video: {video_path}")
-                self.logger.info(f"Classwise Counts: {self.counter.classwise_counts}")
+                self.logger.info(f"Classwise Counts: {payload}")
 
             cap.release()
-            return self.counter.classwise_counts
+            return payload
 
         except Exception as e:
             self.logger.error(f"Error processing video {video_path}: {e}")
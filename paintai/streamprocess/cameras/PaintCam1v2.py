@@ -112,17 +112,18 @@ class CAMERAMODEL:
                     _ = self.counter.count(frame)
                     frame_count += 1
 
-                self.counter.classwise_counts["starttime"] = starttime
-                self.counter.classwise_counts["endtime"] = datetime.now().isoformat()
-                self.counter.classwise_counts["cameraid"] = self.camera_config["camera_id"]
+                payload = self.counter.counts_payload()
+                payload["starttime"] = starttime
+                payload["endtime"] = datetime.now().isoformat()
+                payload["cameraid"] = self.camera_config["camera_id"]
                 
-                success = self.send_post_request(self.counter.classwise_counts)
+                success = self.send_post_request(payload)
                 if success:
                     self.logger.info(f"Successfully processed and sent data for video: {video_path}")
-                    self.logger.info(f"Classwise Counts: {self.counter.classwise_counts}")
+                    self.logger.info(f"Classwise Counts: {payload}")
                 else:
                     self.logger.warning(f"Failed to send data for video: {video_path}")
-                    self.logger.info(f"Classwise Counts: {self.counter.classwise_counts}")
+                    self.logger.info(f"Classwise Counts: {payload}")
 
                 self.counter.reset_count()
                 cap.release()
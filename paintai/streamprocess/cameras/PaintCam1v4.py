@@ -125,16 +125,17 @@ class CAMERAMODEL():
                     img_count += 1
                     if frame_count % (self.fps * self.update_duration) == 0:
                         try:
-                            self.counter.classwise_counts["starttime"] = starttime
-                            self.counter.classwise_counts["endtime"] = datetime.now().isoformat()
-                            self.counter.classwise_counts["cameraid"] = self.camera_config["camera_id"]
-                            success = self.send_post_request(self.counter.classwise_counts)
+                            payload = self.counter.counts_payload()
+                            payload["starttime"] = starttime
+                            payload["endtime"] = datetime.now().isoformat()
+                            payload["cameraid"] = self.camera_config["camera_id"]
+                            success = self.send_post_request(payload)
                             if success:
                                 self.logger.info("Successfully sent to server")
-                                # self.logger.info(("Classiwise Counts sent - ", self.counter.classwise_counts))
+                                # self.logger.info(("Classiwise Counts sent - ", payload))
                             else:
                                 self.logger.info("Failed sent to server")
-                                self.logger.info(("Classiwise Counts sent - ", self.counter.classwise_counts))
+                                self.logger.info(("Classiwise Counts sent - ", payload))
                         except Exception as e:
                             self.logger.error("Error Sending to Server")
                             self.logger.error(e)
@@ -115,11 +115,12 @@ class CAMERAMODEL():
 
                     if frame_count % (self.fps * self.update_duration) == 0:
                         try:
-                            self.counter.classwise_counts["starttime"] = starttime
-                            self.counter.classwise_counts["endtime"] = datetime.now().isoformat()
-                            self.counter.classwise_counts["cameraid"] = self.camera_config["camera_id"]
-                            self.logger.info(("Classwise Counts sent - ", self.counter.classwise_counts))
-                            # success = self.send_post_request(self.counter.classwise_counts)
+                            payload = self.counter.counts_payload()
+                            payload["starttime"] = starttime
+                            payload["endtime"] = datetime.now().isoformat()
+                            payload["cameraid"] = self.camera_config["camera_id"]
+                            self.logger.info(("Classwise Counts sent - ", payload))
+                            # success = self.send_post_request(payload)
                         except Exception as e:
                             self.logger.error("Error Sending to Server")
                             self.logger.error(e)
@@ -0,0 +1,88 @@
+import shapely
+from shapely.geometry import LineString, Polygon
+
+from LineCrossing import line_coefficients, line_crossings, polygon_entries
+
+
+class RegionGeometry():
+
+    __slots__ = ("native_points", "scale", "points", "vertical", "bounds", "shape", "coefficients")
+
+    def __init__(self, native_points, scale=(1.0, 1.0)):
+        """
+        Counting region compiled once for the per-frame counting path.
+
+        Everything that only depends on the region points is computed here: the points mapped onto the analysed
+        frame size, the counting orientation (decided on the configured native points), the bounds, and either the
+        half-plane coefficients of a counting line or a prepared polygon. Counting a frame is then only arithmetic
+        on the track arrays. Instances are immutable; build a new one with `rescaled` or `with_points` when the
+        frame scale or the region points change at runtime.
+
+        Args:
+            native_points (List[Tuple[float, float]]): Region points in native stream pixels, two for a line and
+                three or more for a polygon.
+            scale (Tuple[float, float]): Scale from native stream pixels to the analysed frames.
+
+        Examples:
+            >>> geometry = RegionGeometry([(1250, 0), (1250, 1440)], scale=(0.25, 0.25))
+            >>> counted, inward = geometry.crossings(prev_positions, current_centroids)
+        """
+        if len(native_points) < 2:
+            raise ValueError(f"A counting region needs at least 2 points, got {len(native_points)}")
+        sx, sy = scale
+        native_points = tuple(tuple(p) for p in native_points)
+        points = tuple((x * sx, y * sy) for x, y in native_points)
+        xs = [p[0] for p in native_points]
+        ys = [p[1] for p in native_points]
+        if len(points) == 2:  # Linear region (defined as a line segment)
+            vertical = abs(xs[0] - xs[1]) < abs(ys[0] - ys[1])
+            shape = LineString(points)
+            coefficients = line_coefficients(points[0], points[1])
+        else:  # Polygonal region
+            vertical = max(xs) - min(xs) < max(ys) - min(ys)
+            shape = Polygon(points)
+            shapely.prepare(shape)
+            coefficients = None
+
+        for name, value in (
+            ("native_points", native_points),
+            ("scale", (sx, sy)),
+            ("points", points),
+            ("vertical", vertical),  # Orientation is decided on the configured, unscaled points
+            ("bounds", tuple(float(b) for b in shape.bounds)),
+            ("shape", shape),
+            ("coefficients", coefficients),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @property
+    def is_line(self):
+        return self.coefficients is not None
+
+    def rescaled(self, scale):
+        """Returns the same region compiled for another analysed frame size, or self if the scale is unchanged."""
+        return self if tuple(scale) == self.scale else RegionGeometry(self.native_points, scale)
+
+    def with_points(self, native_points):
+        """Returns the region compiled for new native points at the same scale, or self if the points are unchanged."""
+        if tuple(tuple(p) for p in native_points) == self.native_points:
+            return self
+        return RegionGeometry(native_points, self.scale)
+
+    def crossings(self, prev, curr):
+        """
+        Tests the last step of every track against the region.
+
+        Args:
+            prev (numpy.ndarray): (N, 2) previous positions of the tracks.
+            curr (numpy.ndarray): (N, 2) current centroids of the tracks.
+
+        Returns:
+            (Tuple[numpy.ndarray, numpy.ndarray]): (N,) masks of tracks to count and of tracks moving inward.
+        """
+        if self.is_line:
+            return line_crossings(self.points[0], self.points[1], prev, curr, self.vertical, self.coefficients)
+        return polygon_entries(self.shape, prev, curr, self.vertical, self.bounds)
@@ -0,0 +1,201 @@
+import os
+import time
+import threading
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+
+HEADER = np.dtype([("published", "<u8"), ("slots", "<u8"), ("capacity", "<u8")])
+SLOT_HEADER = np.dtype(
+    [("seq", "<u8"), ("timestamp", "<f8"), ("height", "<u4"), ("width", "<u4"), ("channels", "<u4"), ("pad", "<u4")]
+)
+
+
+class SharedFrames():
+
+    def __init__(self, name, height=None, width=None, slots=3, create=False):
+        """
+        Fixed-size frame slots in `multiprocessing.shared_memory` for moving decoded frames between processes.
+
+        One segment per camera holds `slots` frames. Every slot starts with a small header (sequence number,
+        timestamp and shape) followed by the raw bgr24 pixels. The writer fills the slots round-robin and publishes
+        each frame with a seqlock-style sequence number: the slot's `seq` is odd while it is being written and even
+        once the frame is complete, so readers never need a lock. A reader maps a frame as a NumPy view without
+        pickling or copying and checks `is_current` afterwards to make sure the writer did not lap it meanwhile.
+
+        Slots filled by `read_from` stay pinned until `release`; the writer skips pinned slots (frame numbers of
+        skipped slots are never published), so a frame queued or under inference is not overwritten.
+
+        Args:
+            name (str): Segment name shared by the writer and its readers, e.g. "camduc_cam2".
+            height (int | None): Frame height, required when creating the segment.
+            width (int | None): Frame width, required when creating the segment.
+            slots (int): Number of frame slots, required when creating the segment.
+            create (bool): True in the decoding process that owns and writes the segment, False to attach to it.
+
+        Examples:
+            >>> frames = SharedFrames("camduc_cam2", 1440, 2560, slots=3, create=True)  # decoder process
+            >>> seq = frames.write(frame)
+            >>> reader = SharedFrames("camduc_cam2")  # inference process
+            >>> view = reader.get(seq)
+        """
+        self.name = name
+        self.owner = create
+        self.shape = (height, width, 3)  # Shape of the frames `read_from` expects on the pipe
+        if create:
+            capacity = height * width * 3
+            size = HEADER.itemsize + slots * (SLOT_HEADER.itemsize + capacity)
+            try:
+                self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+            except FileExistsError:  # Left behind by a worker that did not shut down cleanly
+                stale = shared_memory.SharedMemory(name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+            self.header = np.ndarray((), HEADER, buffer=self.shm.buf)
+            self.header["published"] = 0
+            self.header["slots"] = slots
+            self.header["capacity"] = capacity
+        else:
+            self.shm = shared_memory.SharedMemory(name)
+            if os.name != "nt":  # Readers must not unlink the writer's segment when they exit
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+            self.header = np.ndarray((), HEADER, buffer=self.shm.buf)
+
+        self.slots = int(self.header["slots"])
+        self.capacity = int(self.header["capacity"])
+        self.slot_headers = []
+        self.slot_data = []
+        for slot in range(self.slots):
+            offset = HEADER.itemsize + slot * (SLOT_HEADER.itemsize + self.capacity)
+            self.slot_headers.append(np.ndarray((), SLOT_HEADER, buffer=self.shm.buf, offset=offset))
+            self.slot_data.append(
+                np.ndarray((self.capacity,), np.uint8, buffer=self.shm.buf, offset=offset + SLOT_HEADER.itemsize)
+            )
+        self.views = [memoryview(data) for data in self.slot_data]  # byte views for readinto
+        self.pinned = set()  # Slots of the writer holding frames that are queued or under inference
+        self.lock = threading.Lock()
+
+    def begin(self, pin=False):
+        """Marks the next free slot as being written and returns its frame number."""
+        with self.lock:
+            published = int(self.header["published"])
+            for n in range(published, published + self.slots):
+                if n % self.slots not in self.pinned:
+                    break
+            else:
+                raise RuntimeError(f"All {self.slots} slots of {self.name} are pinned")
+            if pin:
+                self.pinned.add(n % self.slots)
+        self.slot_headers[n % self.slots]["seq"] = 2 * n + 1
+        return n
+
+    def slot_of(self, frame):
+        address = frame.__array_interface__["data"][0]
+        for slot, data in enumerate(self.slot_data):
+            if address == data.__array_interface__["data"][0]:
+                return slot
+        return None
+
+    def release(self, frame):
+        """Unpins the slot of a frame returned by `read_from` so the writer can fill it again."""
+        with self.lock:
+            self.pinned.discard(self.slot_of(frame))
+
+    def commit(self, n, shape, timestamp=None):
+        """Publishes frame `n` once its pixels are in place and returns its sequence number."""
+        slot = self.slot_headers[n % self.slots]
+        slot["height"], slot["width"], slot["channels"] = shape
+        slot["timestamp"] = time.time() if timestamp is None else timestamp
+        slot["seq"] = 2 * n + 2
+        self.header["published"] = n + 1
+        return 2 * n + 2
+
+    def view(self, n, shape):
+        size = shape[0] * shape[1] * shape[2]
+        return self.slot_data[n % self.slots][:size].reshape(shape)
+
+    def write(self, frame, timestamp=None):
+        """
+        Copies a frame into the next free slot.
+
+        Returns:
+            (int): Sequence number readers use to fetch the frame.
+        """
+        if frame.nbytes > self.capacity:
+            raise ValueError(f"Frame of shape {frame.shape} does not fit the {self.capacity} byte slots of {self.name}")
+        n = self.begin()
+        self.view(n, frame.shape)[...] = frame
+        return self.commit(n, frame.shape, timestamp)
+
+    def read_from(self, stream):
+        """
+        Reads one bgr24 frame from a binary stream straight into the next free slot and pins it, like
+        `FrameRing.read_from`.
+
+        Returns:
+            (numpy.ndarray | None): View of the published frame, or None if the stream ended early.
+        """
+        size = self.capacity
+        n = self.begin(pin=True)
+        view = self.views[n % self.slots]
+        filled = 0
+        while filled < size:
+            read = stream.readinto(view[filled:size])
+            if not read:
+                with self.lock:
+                    self.pinned.discard(n % self.slots)
+                return None
+            filled += read
+        self.commit(n, self.shape)
+        return self.view(n, self.shape)
+
+    def seq_of(self, frame):
+        """Returns the sequence number of `frame` if it is a published view of one of the slots, else None."""
+        slot = self.slot_of(frame)
+        if slot is None:
+            return None
+        seq = int(self.slot_headers[slot]["seq"])
+        return seq if seq % 2 == 0 else None
+
+    def get(self, seq):
+        """
+        Maps a published frame as a NumPy view without copying.
+
+        Returns:
+            (numpy.ndarray | None): The frame, or None if its slot has already been reused for a newer frame.
+        """
+        n = seq // 2 - 1
+        slot = self.slot_headers[n % self.slots]
+        if int(slot["seq"]) != seq:
+            return None
+        return self.view(n, (int(slot["height"]), int(slot["width"]), int(slot["channels"])))
+
+    def latest(self):
+        """Returns the newest published frame with its sequence number and timestamp, or (None, None, None)."""
+        published = int(self.header["published"])
+        if not published:
+            return None, None, None
+        seq = 2 * published
+        frame = self.get(seq)
+        if frame is None:
+            return None, None, None
+        return frame, seq, float(self.slot_headers[(published - 1) % self.slots]["timestamp"])
+
+    def is_current(self, seq):
+        """Checks that the slot still holds frame `seq`, i.e. a view taken from `get` was not overwritten."""
+        return int(self.slot_headers[(seq // 2 - 1) % self.slots]["seq"]) == seq
+
+    def close(self):
+        """Releases the mapping; the owning writer also removes the segment."""
+        self.header = None
+        self.slot_headers = []
+        self.slot_data = []
+        for view in self.views:
+            view.release()
+        self.views = []
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A frame view is still alive; the mapping goes away with it
+        if self.owner:
+            self.shm.unlink()
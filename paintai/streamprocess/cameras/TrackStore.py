@@ -0,0 +1,132 @@
+import numpy as np
+
+
+class TrackStore():
+
+    def __init__(self, history=30, max_age=150, max_tracks=1024):
+        """
+        Bounded per-camera store for track histories and counted track IDs.
+
+        Every track gets a slot in preallocated arrays holding a fixed-length ring of its last `history` centroids,
+        so memory is capped at `max_tracks` tracks no matter how long the worker runs. Tracks that have not been seen
+        for `max_age` frames are evicted; when all slots are taken the least recently seen track makes room.
+        Counted IDs live in one set per counting zone for constant-time membership checks.
+
+        Args:
+            history (int): Number of centroids kept per track.
+            max_age (int): Frames a track may go unseen before it is evicted. Keep it above the tracker's
+                track_buffer so a briefly lost track keeps its history.
+            max_tracks (int): Hard cap on the number of tracks held.
+
+        Examples:
+            >>> store = TrackStore(history=30, max_age=150, max_tracks=1024)
+            >>> prev_positions = store.update([1, 2], np.array([[100.0, 200.0], [300.0, 400.0]]))
+        """
+        self.history = history
+        self.max_age = max_age
+        self.max_tracks = max_tracks
+
+        self.positions = np.zeros((max_tracks, history, 2), dtype=np.float64)  # Ring of centroids per slot
+        self.heads = np.zeros(max_tracks, dtype=np.int64)  # Next write position in each ring
+        self.lengths = np.zeros(max_tracks, dtype=np.int64)  # Centroids stored per slot, up to `history`
+        self.last_seen = np.full(max_tracks, -1, dtype=np.int64)  # Frame each slot was last updated, -1 when free
+        self.track_ids = np.full(max_tracks, -1, dtype=np.int64)  # Track held by each slot
+
+        self.slots = {}  # track_id -> slot
+        self.free = list(range(max_tracks - 1, -1, -1))
+        self.counted = {}  # zone name -> IDs of tracks already counted there in the current window
+        self.frame = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, track_id):
+        return track_id in self.slots
+
+    def release(self, slots):
+        for slot in slots:
+            track_id = int(self.track_ids[slot])
+            del self.slots[track_id]
+            for counted in self.counted.values():
+                counted.discard(track_id)
+            self.track_ids[slot] = -1
+            self.last_seen[slot] = -1
+            self.lengths[slot] = 0
+            self.heads[slot] = 0
+            self.free.append(int(slot))
+
+    def evict(self):
+        """Drops tracks not seen for more than `max_age` frames."""
+        stale = np.flatnonzero((self.last_seen >= 0) & (self.frame - self.last_seen > self.max_age))
+        if len(stale):
+            self.release(stale)
+
+    def slot_for(self, track_id):
+        slot = self.slots.get(track_id)
+        if slot is None:
+            if not self.free:  # Hard cap reached: make room by dropping the least recently seen track
+                used = np.flatnonzero(self.last_seen >= 0)
+                self.release([used[np.argmin(self.last_seen[used])]])
+            slot = self.free.pop()
+            self.slots[track_id] = slot
+            self.track_ids[slot] = track_id
+        return slot
+
+    def update(self, track_ids, centroids):
+        """
+        Appends the centroids of one frame to the histories of their tracks.
+
+        Args:
+            track_ids (numpy.ndarray | List[int]): Track IDs present in the frame.
+            centroids (numpy.ndarray): (N, 2) centroids of those tracks.
+
+        Returns:
+            (numpy.ndarray): (N, 2) position of each track in its previous observation, NaN for new tracks.
+        """
+        self.frame += 1
+        self.evict()
+        prev_positions = np.full((len(track_ids), 2), np.nan)
+        if not len(track_ids):
+            return prev_positions
+
+        slot_for = self.slot_for
+        slots = np.fromiter(
+            (slot_for(track_id) for track_id in np.asarray(track_ids).tolist()), dtype=np.int64, count=len(track_ids)
+        )
+        heads = self.heads[slots]
+        self.positions[slots, heads] = centroids
+        self.heads[slots] = (heads + 1) % self.history
+        self.lengths[slots] = np.minimum(self.lengths[slots] + 1, self.history)
+        self.last_seen[slots] = self.frame
+
+        seen = self.lengths[slots] > 1
+        prev_positions[seen] = self.positions[slots[seen], (heads[seen] - 1) % self.history]
+        return prev_positions
+
+    def track_line(self, track_id):
+        """Returns the stored centroids of a track, oldest first, as an (M, 2) array."""
+        slot = self.slots.get(track_id)
+        if slot is None:
+            return np.empty((0, 2))
+        length, head = self.lengths[slot], self.heads[slot]
+        return self.positions[slot, (head - length + np.arange(length)) % self.history]
+
+    def counted_in(self, zone=""):
+        """Returns the set of track IDs counted in `zone` during the current window."""
+        return self.counted.setdefault(zone, set())
+
+    def is_counted(self, track_ids, zone=""):
+        """Returns a boolean mask of the track IDs already counted in `zone` during the current window."""
+        counted = self.counted_in(zone)
+        if not counted:
+            return np.zeros(len(track_ids), dtype=bool)
+        return np.fromiter(
+            (track_id in counted for track_id in np.asarray(track_ids).tolist()), dtype=bool, count=len(track_ids)
+        )
+
+    def mark_counted(self, track_ids, zone=""):
+        self.counted_in(zone).update(track_ids)
+
+    def reset_counted(self):
+        for counted in self.counted.values():
+            counted.clear()
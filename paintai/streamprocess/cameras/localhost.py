@@ -110,10 +110,11 @@ class CAMERAMODEL():
                     frame_count += 1
                     if frame_count % (self.fps * self.update_duration) == 0:
                         try:
-                            self.counter.classwise_counts["starttime"] = starttime
-                            self.counter.classwise_counts["endtime"] = datetime.now().isoformat()
-                            self.counter.classwise_counts["cameraid"] = self.camera_config["camera_id"]
-                            success = self.send_post_request(self.counter.classwise_counts)
+                            payload = self.counter.counts_payload()
+                            payload["starttime"] = starttime
+                            payload["endtime"] = datetime.now().isoformat()
+                            payload["cameraid"] = self.camera_config["camera_id"]
+                            success = self.send_post_request(payload)
                             if success:
                                 self.logger.info("Successfully sent to server")
                             else:
@@ -1,12 +1,10 @@
-import subprocess
-import subprocess
 import os
 from django.conf import settings
 from paintai.models import Camera
-import time
+from .serviceManager import get_service_manager
 # from elevate import elevate
 
-nssm_path = settings.NSSMPATH # Path to NSSM executable
+# NSSM, or the backend named by settings.SERVICEMANAGER, runs the camera worker services
 
 def create_copy_of_pyfile(original_file,new_file):
     try:
@@ -60,40 +58,13 @@ def edit_python_file(file_path, old_content, new_content):
 
 
 def create_nssm_service(service_name, executable_path, args, display_name, appdir):
-    global nssm_path
-    # elevate()
-    # Construct the command to create the service
-    install_command = [nssm_path, 'install', service_name,executable_path,args]
-    set_appdir_command = [nssm_path, 'set', service_name,'AppDirectory', appdir]
-    set_app_command = [nssm_path, 'set', service_name,'Application', executable_path]
-    set_appargs_command = [nssm_path, 'set', service_name,'AppParameters', args]
-    set_display_command = [nssm_path, 'set', service_name,'DisplayName', display_name]
-    set_ffmpeg_env_command = [nssm_path, 'set', service_name,'AppEnvironmentExtra', f"PATH={settings.FFMPEGDIR}"]
-    remove_command =  [nssm_path,'remove', service_name,'confirm']
-    try:
-
-        subprocess.run(install_command, shell=True)
-        time.sleep(1)
-        subprocess.run(set_app_command, shell=True)
-        time.sleep(1)
-        subprocess.run(set_appargs_command, shell=True)
-        time.sleep(1)
-        subprocess.run(set_ffmpeg_env_command, shell=True)
-        time.sleep(1)        
-        subprocess.run(set_display_command, shell=True)
-        time.sleep(1)
-        subprocess.run(set_appdir_command, shell=True)
-        print(set_appdir_command)
-        time.sleep(1)
-    except subprocess.CalledProcessError as e:
-        print(f'Error: {e}')
-        subprocess.run(remove_command, shell=True)
-        return
+    get_service_manager().install(
+        service_name, executable_path, args, display_name, appdir, environment={"PATH": settings.FFMPEGDIR}
+    )
     print("Successfully Created Services")
 
 
 def delete_nssm_service(id):
-    global nssm_path
     camera = Camera.objects.get(pk=id)
     print(camera)
     new_camera_name = camera.name
@@ -101,36 +72,22 @@ def delete_nssm_service(id):
     current_script_path = os.path.abspath(__file__)
     parent_directory = os.path.dirname(os.path.dirname(current_script_path))
     new_file_paths = os.path.join(parent_directory,"cameras",f"{new_camera_name}.py")
-    remove_command =  [nssm_path,'remove', service_name,'confirm']
-    try:
-        subprocess.run(remove_command, shell=True)
-        os.remove(new_file_paths)
-        camera.delete()
-    except subprocess.CalledProcessError as e:
-        print(f'Error: {e}')
-        return
+    get_service_manager().remove(service_name)
+    os.remove(new_file_paths)
+    camera.delete()
     print(f"Successfully Deleted Services {service_name}")
 
 def start_nssm_service(service_name):
-    global nssm_path
-    start_command =  [nssm_path,'start', service_name]
-    try:
-        subprocess.run(start_command, shell=True)
-    except subprocess.CalledProcessError as e:
-        print(f'Error: {e}')
-        return
+    get_service_manager().start(service_name)
     print(f"Successfully Started Services {service_name}")
 
 def stop_nssm_service(service_name):
-    global nssm_path
-    stop_command =  [nssm_path,'stop', service_name]
-    try:
-        subprocess.run(stop_command, shell=True)
-    except subprocess.CalledProcessError as e:
-        print(f'Error: {e}')
-        return
+    get_service_manager().stop(service_name)
     print(f"Successfully Stopped Services {service_name}")
 
+def camera_service_name(camera_ip):
+    return f"SudisaPaintAI{camera_ip.split('.')[-1]}"
+
 def create_new_camera_add_service(new_camera_name,new_camera_ip):
     current_script_path = os.path.abspath(__file__)
     parent_directory = os.path.dirname(os.path.dirname(current_script_path))
@@ -140,36 +97,36 @@ def create_new_camera_add_service(new_camera_name,new_camera_ip):
     old_log = "D:"
     old_camera_name = "Camera110"
     new_log = os.path.join(settings.BASE_DIR,"paintai","logs")
-    new_file_paths = [os.path.join(parent_directory,"cameras",f"{new_camera_name}.py")]
-    new_contents = [new_camera_ip]
-    for i,new_file_path in enumerate(new_file_paths):
-        try:
-            create_copy_of_pyfile(old_file_path,new_file_path)
-            edit_python_file(new_file_path, old_content, new_contents[i])
-            edit_python_file(new_file_path, old_log, new_log)
-            edit_python_file(new_file_path, old_camera_name, new_camera_name)
-            camera_extension = new_contents[i].split(".")[-1]
-            create_nssm_service(
-                service_name=f'SudisaPaintAI{camera_extension}',
-                executable_path=settings.PYTHONVENVPATH,
-                args=f"{new_camera_name}.py",
-                appdir=settings.APPDIR,
-                display_name=f"SudisaPaintAI{camera_extension}")
-            camera = Camera(
-                name=new_camera_name,
-                ipaddr=new_camera_ip,
-                servicename=f'SudisaPaintAI{camera_extension}'
-            )
-            camera.save()
-            edit_python_file(new_file_path, old_id, str(camera.id))
-        except Exception as e:
-            print(str(e))
+    new_file_path = os.path.join(parent_directory,"cameras",f"{new_camera_name}.py")
+    # Errors propagate so the service job that runs this records them
+    create_copy_of_pyfile(old_file_path,new_file_path)
+    edit_python_file(new_file_path, old_content, new_camera_ip)
+    edit_python_file(new_file_path, old_log, new_log)
+    edit_python_file(new_file_path, old_camera_name, new_camera_name)
+    service_name = camera_service_name(new_camera_ip)
+    create_nssm_service(
+        service_name=service_name,
+        executable_path=settings.PYTHONVENVPATH,
+        args=f"{new_camera_name}.py",
+        appdir=settings.APPDIR,
+        display_name=service_name)
+    camera = Camera(
+        name=new_camera_name,
+        ipaddr=new_camera_ip,
+        servicename=service_name
+    )
+    camera.save()
+    edit_python_file(new_file_path, old_id, str(camera.id))
+    return camera
 
 def get_camera_list_from_db():
     queryset = Camera.objects.all().values()
     data = list(queryset)
     return data
 
+async def aget_camera_list_from_db():
+    return [camera async for camera in Camera.objects.all().values()]
+
 # if __name__=="__main__":
 #     old_file_path = 'dummy.py'
 #     old_content = '192.168.1.1'  
@@ -0,0 +1,152 @@
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+from functools import cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULT_SERVICE_MANAGER = "paintai.streamprocess.source.serviceManager.NssmServiceManager"
+
+
+class NssmServiceManager:
+    """Camera worker services registered with NSSM on Windows; every call blocks until NSSM is done."""
+
+    def __init__(self, nssm_path=None, delay=1):
+        self.nssm_path = nssm_path or settings.NSSMPATH
+        self.delay = delay  # Pause between the NSSM commands of one install
+
+    def run(self, *args):
+        subprocess.run([self.nssm_path, *args], shell=True, check=True)
+
+    def install(self, service_name, executable_path, args, display_name, appdir, environment):
+        commands = [
+            ['install', service_name, executable_path, args],
+            ['set', service_name, 'Application', executable_path],
+            ['set', service_name, 'AppParameters', args],
+            ['set', service_name, 'AppEnvironmentExtra', *(f"{key}={value}" for key, value in environment.items())],
+            ['set', service_name, 'DisplayName', display_name],
+            ['set', service_name, 'AppDirectory', appdir],
+        ]
+        try:
+            for command in commands:
+                self.run(*command)
+                time.sleep(self.delay)
+        except subprocess.CalledProcessError:
+            subprocess.run([self.nssm_path, 'remove', service_name, 'confirm'], shell=True)
+            raise
+
+    def remove(self, service_name):
+        self.run('remove', service_name, 'confirm')
+
+    def start(self, service_name):
+        self.run('start', service_name)
+
+    def stop(self, service_name):
+        self.run('stop', service_name)
+
+
+class ProcessServiceManager:
+    """
+    Stand-in for NSSM on Linux and in tests: services are child processes of the job worker.
+
+    Each service is a JSON definition in `state_dir` and, while it runs, a pid file next to it, so `stop` and
+    `remove` also reach services started by an earlier worker. Output goes to `<service>.log` in the same directory.
+    """
+
+    def __init__(self, state_dir=None, stop_timeout=10):
+        self.state_dir = state_dir or getattr(
+            settings, "SERVICESTATEDIR", os.path.join(settings.BASE_DIR, "paintai", "logs", "services")
+        )
+        self.stop_timeout = stop_timeout
+        self.processes = {}  # service name -> Popen of the services started by this process
+        self.lock = threading.Lock()
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def path(self, service_name, extension):
+        return os.path.join(self.state_dir, f"{service_name}.{extension}")
+
+    def definition(self, service_name):
+        try:
+            with open(self.path(service_name, "json")) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            raise LookupError(f"Service '{service_name}' does not exist") from None
+
+    def pid(self, service_name):
+        """Pid of the running service, or None."""
+        process = self.processes.get(service_name)
+        if process is not None:
+            return process.pid if process.poll() is None else None
+        try:
+            with open(self.path(service_name, "pid")) as file:
+                pid = int(file.read())
+            os.kill(pid, 0)
+        except (FileNotFoundError, ValueError, ProcessLookupError):
+            return None
+        return pid
+
+    def install(self, service_name, executable_path, args, display_name, appdir, environment):
+        with self.lock:
+            if os.path.exists(self.path(service_name, "json")):
+                raise ValueError(f"Service '{service_name}' already exists")
+            with open(self.path(service_name, "json"), "w") as file:
+                json.dump({
+                    "executable_path": executable_path,
+                    "args": args,
+                    "display_name": display_name,
+                    "appdir": appdir,
+                    "environment": environment,
+                }, file)
+
+    def remove(self, service_name):
+        self.definition(service_name)
+        self.stop(service_name)
+        os.remove(self.path(service_name, "json"))
+
+    def start(self, service_name):
+        with self.lock:
+            definition = self.definition(service_name)
+            if self.pid(service_name) is not None:
+                return
+            environment = {**os.environ, **definition["environment"]}
+            if "PATH" in definition["environment"]:  # Extra PATH entries go in front of the inherited ones
+                environment["PATH"] = os.pathsep.join([definition["environment"]["PATH"], os.environ.get("PATH", "")])
+            with open(self.path(service_name, "log"), "ab") as log:
+                process = subprocess.Popen(
+                    [definition["executable_path"], *definition["args"].split()],
+                    cwd=definition["appdir"],
+                    env=environment,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True,
+                )
+            self.processes[service_name] = process
+            with open(self.path(service_name, "pid"), "w") as file:
+                file.write(str(process.pid))
+
+    def stop(self, service_name):
+        with self.lock:
+            self.definition(service_name)
+            pid = self.pid(service_name)
+            if pid is not None:
+                os.kill(pid, signal.SIGTERM)
+                deadline = time.monotonic() + self.stop_timeout
+                while self.pid(service_name) is not None and time.monotonic() < deadline:
+                    time.sleep(0.1)
+                if self.pid(service_name) is not None:
+                    os.kill(pid, signal.SIGKILL)
+            process = self.processes.pop(service_name, None)
+            if process is not None:
+                process.wait()
+            if os.path.exists(self.path(service_name, "pid")):
+                os.remove(self.path(service_name, "pid"))
+
+
+@cache
+def get_service_manager():
+    """The backend named by the SERVICEMANAGER setting, NSSM by default."""
+    return import_string(getattr(settings, "SERVICEMANAGER", DEFAULT_SERVICE_MANAGER))()
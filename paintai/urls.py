@@ -14,6 +14,7 @@ urlpatterns = [
     path("getallcameras",views.getAllCameras, name="getallcameras"),
     path("startService",views.startService, name="startService"),
     path("stopService",views.stopService, name="stopService"),
+    path("getjob/<int:job_id>",views.get_service_job, name="get_service_job"),
 
     path('createproduct', views.create_product, name='create_product'),
     path('getproduct/<int:product_id>', views.get_product, name='get_product'),
@@ -31,12 +32,16 @@ urlpatterns = [
     path('getallproduction', views.get_all_production, name='get_all_production'),
     path('getproductionbydate', views.get_production_by_date, name='get_production_by_date'),
     path('getproductionbyfilter', views.get_production_by_filter, name='get_production_by_filter'),
+    path('getproductionseries', views.get_production_series, name='get_production_series'),
     path('gettopproduction', views.get_production_top5, name='get_production_top5'),
     path('download-csv/', views.get_production_by_date_download_csv, name='download_csv'),
     path('createproduction', views.create_production, name='get_all_production'),
 
 
     path('getcampayload', views.getCameraPayload, name='getCameraPayload'),
+    path('getdashboardsummary', views.get_dashboard_summary_view, name='get_dashboard_summary'),
+    path('getcachestats', views.get_cache_stats, name='get_cache_stats'),
+    path('live', views.live_dashboard, name='live_dashboard'),
 
 
 ]
\ No newline at end of file
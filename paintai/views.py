@@ -1,69 +1,127 @@
 from django.shortcuts import render
-from .streamprocess.source.addCamera import create_new_camera_add_service,\
-    delete_nssm_service,start_nssm_service,stop_nssm_service,get_camera_list_from_db
+from .streamprocess.source.addCamera import camera_service_name,get_camera_list_from_db,aget_camera_list_from_db
 from .products import *
 from .productprod import *
 from .productprod import *
 from .camera import *
+from .lookups import lookup_stats
+from .live import broadcaster, filtered_production
+from .dashboard import get_dashboard_summary
+from .series import production_series
+from .jobs import enqueue_job, job_data, worker
+from .models import Camera, ServiceJob
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
 import json
-from django.http import HttpResponse,JsonResponse
+from django.http import HttpResponse,JsonResponse,StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.text import compress_sequence
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from datetime import datetime
-import time 
 import csv
+from itertools import chain
 from django.shortcuts import render
 
 def index(request):
     return HttpResponse("Hello, world. You're at the polls index.")
 
 
-def get_total_camera_count(request):
+# Read endpoints are async views: under the ASGI application they wait on the database without holding a worker
+# thread, so dashboards keep being served while NSSM commands or ingest posts run. Aggregations built on the sync
+# helpers of productprod.py run through sync_to_async.
+
+async def iterate_in_thread(iterable):
+    """Async iterator over a sync one, advanced in the request's sync thread (database cursors stay there)."""
+    iterator = iter(iterable)
+    done = object()
+    while (item := await sync_to_async(next)(iterator, done)) is not done:
+        yield item
+
+
+def streaming_body(request, iterable):
+    """Streams a sync iterable as is under WSGI and without blocking the event loop under ASGI."""
+    return iterate_in_thread(iterable) if isinstance(request, ASGIRequest) else iterable
+
+
+def join_chunks(lines, chunk_size=64 * 1024):
+    """
+    Joins lines into chunks of about `chunk_size` characters, so a streamed body makes one thread hop per chunk
+    instead of one per row under ASGI.
+    """
+    chunk, size = [], 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk)
+
+
+async def get_total_camera_count(request):
     try:
-        total_count = get_total_camera_count_fn()
+        total_count = await aget_total_camera_count_fn()
         return JsonResponse({"total_count": total_count}, status=200)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
-def get_total_product_count(request):
+async def get_total_product_count(request):
     try:
-        total_count = get_total_product_count_fn()
+        total_count = await aget_total_product_count_fn()
         return JsonResponse({"total_count": total_count}, status=200)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
-def get_total_active_camera_count(request):
+async def get_total_active_camera_count(request):
     try:
-        total_count = get_active_non_deleted_camera_count_fn()
+        total_count = await aget_active_non_deleted_camera_count_fn()
         return JsonResponse({"total_count": total_count}, status=200)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
     
 
+# Creating, deleting, starting and stopping camera services runs NSSM for seconds, so these views only queue a
+# ServiceJob and answer 202 with its id; the job worker (paintai/jobs.py) runs it and /ai/getjob/<id> reports it.
+
 def addCamera(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body)
             cameraname = data.get("cameraname")
             ipaddr = data.get("ipaddr")
-            create_new_camera_add_service(cameraname,ipaddr)
-            return JsonResponse({"message": "Service Created", "name": cameraname, "IP": ipaddr})
+            if not cameraname or not ipaddr:
+                return JsonResponse({"error": "cameraname and ipaddr are required"}, status=400)
+            try:
+                validate_ipv46_address(ipaddr)
+            except ValidationError as e:
+                return JsonResponse({"error": e.messages[0]}, status=400)
+            if Camera.objects.filter(name=cameraname).exists():
+                return JsonResponse({"error": f"Camera '{cameraname}' already exists"}, status=400)
+            job = enqueue_job(ServiceJob.CREATE, camera_service_name(ipaddr), cameraname=cameraname, ipaddr=ipaddr)
+            return JsonResponse(
+                {"message": "Service Creation Queued", "job_id": job.id, "name": cameraname, "IP": ipaddr}, status=202
+            )
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
     elif request.method == "DELETE":
         try:
             data = json.loads(request.body)
             cameraid = data.get("cameraid")
-            delete_nssm_service(cameraid)
-            return JsonResponse({"message": "Camera Deleted", "name": cameraid})
+            camera = Camera.objects.get(pk=cameraid)
+            job = enqueue_job(ServiceJob.DELETE, camera.servicename, cameraid=camera.id)
+            return JsonResponse({"message": "Camera Deletion Queued", "job_id": job.id, "name": cameraid}, status=202)
         except Exception as e:
                 return JsonResponse({"error": str(e)}, status=400)
     else:
         return HttpResponse("Please send a post request")
 
 
-def getAllCameras(request):
+async def getAllCameras(request):
     data = None
     try:
-        data = get_camera_list_from_db()
+        data = await aget_camera_list_from_db()
         return JsonResponse(data, safe=False)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
@@ -74,9 +132,9 @@ def startService(request):
         try:
             data = json.loads(request.body)
             servicename = data.get("servicename")
-            start_nssm_service(servicename)
-            activate_camera_fn(servicename,True)
-            return JsonResponse({"message": "Service Started", "name": servicename})
+            Camera.objects.get(servicename=servicename, isdeleted=False)
+            job = enqueue_job(ServiceJob.START, servicename, servicename=servicename)
+            return JsonResponse({"message": "Service Start Queued", "job_id": job.id, "name": servicename}, status=202)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
     else:
@@ -87,17 +145,24 @@ def stopService(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body)
-            print(data)
             servicename = data.get("servicename")
-            stop_nssm_service(servicename)
-            print("service Stopped")
-            activate_camera_fn(servicename,False)
-            print("DB Updated")
-            return JsonResponse({"message": "Service Stopped", "name": servicename})
+            Camera.objects.get(servicename=servicename, isdeleted=False)
+            job = enqueue_job(ServiceJob.STOP, servicename, servicename=servicename)
+            return JsonResponse({"message": "Service Stop Queued", "job_id": job.id, "name": servicename}, status=202)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
     else:
         return HttpResponse("Please send a post request")
+
+
+async def get_service_job(request, job_id):
+    try:
+        job = await ServiceJob.objects.aget(pk=job_id)
+    except ServiceJob.DoesNotExist:
+        return JsonResponse({"error": f"Job {job_id} does not exist"}, status=404)
+    if job.status == ServiceJob.QUEUED:  # Restarts the worker thread if it died
+        worker.wake()
+    return JsonResponse(job_data(job), status=200)
     
 
 def create_product(request):
@@ -114,29 +179,28 @@ def create_product(request):
             return JsonResponse({"error": str(e)}, status=400)
     return JsonResponse({"error": "Invalid request method"}, status=405)
 
-def get_product(request, product_id):
+async def get_product(request, product_id):
     if request.method == "GET":
         try:
-            product = get_product_by_id_fn(product_id)
+            product = await aget_product_by_id_fn(product_id)
             return JsonResponse({"id": product.id, "name": product.name, "createdon": product.createdon}, status=200)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
 
 
-def get_product_by_name(request, product_name):
+async def get_product_by_name(request, product_name):
     if request.method == "GET":
         try:
-            product = get_product_by_name_fn(product_name)
-            print(product)
+            product = await aget_product_by_name_fn(product_name)
             return JsonResponse({"id": product.id, "name": product.name, "createdon": product.createdon}, status=200)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
         
-def get_all_products(request):
+async def get_all_products(request):
     if request.method == "GET":
         try:
             products = get_all_products_fn()
-            product_list = [{"id": p.id, "name": p.name, "createdon": p.createdon} for p in products]
+            product_list = [{"id": p.id, "name": p.name, "createdon": p.createdon} async for p in products]
             return JsonResponse({"products": product_list}, status=200)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
@@ -152,29 +216,55 @@ def soft_delete_product(request, product_id):
 
 
 
-def get_all_production(request):
+def production_row(p):
+    return {"id": p["id"], "camera_id": p["cameraid_id"], "productid": p["productid_id"], "count": p["count"],
+            "starttime": p["starttime"], "endtime": p["endtime"], "zone": p["zone"]}
+
+
+async def get_all_production(request):
+    """
+    Pages through ProductProduction rows in id order: ?after=<last id seen>&limit=<rows, at most 10000>.
+
+    ?format=jsonl streams the rows as JSON lines instead, from `after` to the end of the table unless a limit is
+    given, without holding them in memory.
+    """
     if request.method == "GET":
         try:
-            products = get_all_product_productions_fn()
-            product_list = [{"id": p.id, "camera_id": p.cameraid.id,"productid": p.productid.id,"count": p.count, "starttime": p.starttime,"endtime": p.endtime} for p in products]
-            return JsonResponse({"product_productions": product_list}, status=200)
+            after = int(request.GET.get("after", 0))
+            limit = request.GET.get("limit")
+            limit = int(limit) if limit is not None else None
+            if limit is not None and limit < 1:
+                raise ValueError("limit must be positive")
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        try:
+            if request.GET.get("format") == "jsonl":
+                rows = get_product_productions_after(after, limit).iterator(chunk_size=2000)
+                lines = (json.dumps(production_row(p), cls=DjangoJSONEncoder) + "\n" for p in rows)
+                return StreamingHttpResponse(
+                    streaming_body(request, join_chunks(lines)), content_type="application/x-ndjson"
+                )
+            limit = min(limit or 1000, 10000)
+            product_list = [production_row(p) async for p in get_product_productions_after(after, limit)]
+            next_after = product_list[-1]["id"] if len(product_list) == limit else None
+            return JsonResponse({"product_productions": product_list, "next_after": next_after}, status=200)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
 
 
-def get_production_by_date(request):
+async def get_production_by_date(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body)
             starttime = datetime.strptime(data.get("starttime"), "%Y-%m-%dT%H:%M:%S.%f")
             endtime = datetime.strptime(data.get("endtime"), "%Y-%m-%dT%H:%M:%S.%f")
-            products = get_product_counts(starttime,endtime)
+            products = await sync_to_async(get_product_counts)(starttime,endtime)
             product_list =  list(products)
             return JsonResponse({"product_productions": product_list}, status=200,safe=False)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
 
-def get_production_by_filter(request):
+async def get_production_by_filter(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body)
@@ -182,44 +272,95 @@ def get_production_by_filter(request):
             endtime = datetime.strptime(data.get("endtime"), "%Y-%m-%dT%H:%M:%S.%f")
             camera_id = data.get("cameraid", -1)
             product_id = data.get("productid", -1)
-            products = get_product_counts_bycamproid(starttime, endtime, camera_id, product_id)
+            # The watermark tells the page which live counts events the totals already include
+            watermark, products = await sync_to_async(filtered_production)(starttime, endtime, camera_id, product_id)
             product_list =  list(products)
-            return JsonResponse({"product_productions": product_list}, status=200,safe=False)
+            return JsonResponse({"product_productions": product_list, "watermark": watermark}, status=200,safe=False)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
 
 
 
 
-def get_production_top5(request):
+async def get_production_series(request):
+    """
+    Production counts per time bucket for trend charts. Body: starttime, endtime, and optionally
+    "bucket" ("1m", "5m", "1h", "1d" or "auto"), "cameraids" and "productids" lists, "by_camera" to split the series
+    per camera, and "max_points" (default 500) above which series are downsampled.
+    """
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body)
+            starttime = datetime.strptime(data.get("starttime"), "%Y-%m-%dT%H:%M:%S.%f")
+            endtime = datetime.strptime(data.get("endtime"), "%Y-%m-%dT%H:%M:%S.%f")
+            filters = Q()
+            if data.get("cameraids"):
+                filters &= Q(cameraid__in=[int(camera_id) for camera_id in data["cameraids"]])
+            if data.get("productids"):
+                filters &= Q(productid__in=[int(product_id) for product_id in data["productids"]])
+            series = await sync_to_async(production_series)(
+                starttime, endtime, data.get("bucket", "auto"), filters, bool(data.get("by_camera")),
+                int(data.get("max_points", 500))
+            )
+            return JsonResponse(series, status=200)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({"error": "Invalid request method"}, status=405)
+
+
+async def get_production_top5(request):
     if request.method == "GET":
         try:
-            products = get_productProduction_top_five_last_day()
+            products = await sync_to_async(get_productProduction_top_five_last_day)()
             product_list =  list(products)
             return JsonResponse({"product_productions": product_list}, status=200,safe=False)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
 
-def get_production_by_date_download_csv(request):
+class Echo:
+    """File-like object handing each CSV line back to the caller instead of storing it."""
+    def write(self, value):
+        return value
+
+
+def csv_chunks(header, rows, chunk_size=64 * 1024):
+    """Writes rows as CSV lines and yields them in chunks of about `chunk_size` characters."""
+    writer = csv.writer(Echo())
+    yield from join_chunks((writer.writerow(row) for row in chain([header], rows)), chunk_size)
+
+
+async def get_production_by_date_download_csv(request):
+    """
+    Streams production counts between starttime and endtime as CSV, per camera and product.
+
+    Optional body fields: "bucket": "hour" or "day" adds one row per UTC bucket, "gzip": true compresses the
+    response (Content-Encoding: gzip) when the client accepts it. Rows are produced while the response is sent, so
+    long ranges start downloading at once.
+    """
     if request.method == "POST":
         try:
             data = json.loads(request.body)
             starttime = datetime.strptime(data.get("starttime"), "%Y-%m-%dT%H:%M:%S.%f")
             endtime = datetime.strptime(data.get("endtime"), "%Y-%m-%dT%H:%M:%S.%f")
-            products = get_product_counts(starttime,endtime)
-            product_list =  list(products)
-            data = {"product_productions": product_list}
-            response = HttpResponse(content_type='text/csv')
+            bucket = data.get("bucket")
+            if bucket:
+                productions = await sync_to_async(production_buckets)(starttime, endtime, bucket)
+                header = ['Bucket', 'Camera ID', 'Product ID', 'Product Name', 'Total Count']
+                rows = ([p["bucket"].isoformat(), p["cameraid"], p["productid"], p["productid__name"],
+                         p["total_count"]] for p in productions)
+            else:
+                productions = await sync_to_async(get_product_counts)(starttime, endtime)
+                header = ['Camera ID', 'Product ID', 'Product Name', 'Total Count']
+                rows = ([p["cameraid"], p["productid"], p["productid__name"], p["total_count"]] for p in productions)
+            content = (chunk.encode() for chunk in csv_chunks(header, rows))
+            compress = data.get("gzip") and "gzip" in request.headers.get("Accept-Encoding", "")
+            if compress:
+                content = compress_sequence(content)
+            response = StreamingHttpResponse(streaming_body(request, content), content_type='text/csv')
             response['Content-Disposition'] = 'attachment; filename="product_productions.csv"'
-            writer = csv.writer(response)
-            writer.writerow(['Camera ID', 'Product ID', 'Product Name', 'Total Count'])
-            for production in data["product_productions"]:
-                writer.writerow([
-                    production["cameraid"],
-                    production["productid"],
-                    production["productid__name"],
-                    production["total_count"],
-                ])
+            if compress:
+                response['Content-Encoding'] = 'gzip'
+                response['Vary'] = 'Accept-Encoding'
             return response
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=400)
@@ -242,20 +383,42 @@ def getCameraPayload(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body)
-            print(data)
-            cameraid = data.pop('cameraid')
-            starttime = datetime.strptime(data.pop('starttime'), "%Y-%m-%dT%H:%M:%S.%f")
-            endtime = datetime.strptime(data.pop('endtime'), "%Y-%m-%dT%H:%M:%S.%f")
-            for key,value in data.items():
-                create_product_production(cameraid, key, starttime, endtime, sum(value.values()))
-                time.sleep(1)
-            return JsonResponse({"message": "Service Created"})
-        except Exception as e:
+            # Camera reporters send a JSON array of windows; a single window object is still accepted
+            windows = data if isinstance(data, list) else [data]
+            result = ingest_camera_windows(windows)
+        except ValueError as e:  # Malformed payload, nothing was stored
             return JsonResponse({"error": str(e)}, status=400)
+        except Exception as e:  # Database errors, the camera retries the windows later
+            return JsonResponse({"error": str(e)}, status=500)
+        return JsonResponse({"message": "Service Created", **result})
     else:
         return HttpResponse("Please send a post request")
     
 
+async def get_dashboard_summary_view(request):
+    """Bootstrap data of the home and production pages in one response, served from a cached snapshot."""
+    try:
+        return JsonResponse(await sync_to_async(get_dashboard_summary)(), status=200)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+def get_cache_stats(request):
+    return JsonResponse(lookup_stats(), status=200)
+
+
+async def live_dashboard(request):
+    """
+    Server-Sent Events stream of dashboard updates, subscribed to once per page: a "snapshot" event with the totals
+    and the last 24 h production per product, then a "counts" event with the per-camera, per-product deltas of
+    every ingested batch. Needs an ASGI server (see paintshopproject/asgi.py).
+    """
+    response = StreamingHttpResponse(broadcaster.events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Keep reverse proxies from buffering the stream
+    return response
+
+
 def hometemplate(request):
     return render(request,'index.html')
 
@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+The live dashboard stream (/ai/live) is a long-lived Server-Sent Events response and needs this ASGI application.
+Its broadcaster lives in the server process, so serve the app from a single process: camera payloads posted to
+one process are only pushed to the dashboards connected to that same process.
 """
 
 import os
@@ -14,3 +18,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "paintshopproject.settings")
 
 application = get_asgi_application()
+
+# Start the service job worker so jobs queued before the server (re)started run without waiting for a new one
+from paintai.jobs import worker  # noqa: E402
+
+worker.wake()
@@ -20,6 +20,9 @@ NSSMPATH = 'D:/RohitDa/Camduc/nssm-2.24/nssm-2.24/win64/nssm.exe'
 PYTHONVENVPATH = 'D:/RohitDa/Camduc/.venv/Scripts/python.exe'
 APPDIR = 'D:/RohitDa/Camduc/paintai/streamprocess/cameras'
 FFMPEGDIR = 'D:/RohitDa/Camduc/Ffmpeg/bin'
+# Runs the camera worker services; 'paintai.streamprocess.source.serviceManager.ProcessServiceManager' runs them as
+# plain child processes instead, e.g. on Linux or in tests
+SERVICEMANAGER = 'paintai.streamprocess.source.serviceManager.NssmServiceManager'
 
 UPDATEDURATION = 10 # in Seconds
 # Quick-start development settings - unsuitable for production
@@ -84,6 +87,11 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # WAL lets dashboard reads run while camera payloads are written; writers wait instead of failing
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+            "timeout": 20,
+        },
     }
 }
 
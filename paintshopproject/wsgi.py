@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "paintshopproject.settings")
 
 application = get_wsgi_application()
+
+# Start the service job worker so jobs queued before the server (re)started run without waiting for a new one
+from paintai.jobs import worker  # noqa: E402
+
+worker.wake()